@@ -1,14 +1,54 @@
 """Init for Trannergy integration."""
 
+import contextlib
 import datetime
 import logging
+import os
+import time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_IP_ADDRESS, CONF_PORT, CONF_SCAN_INTERVAL, Platform
 from homeassistant.core import HomeAssistant
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.helpers.typing import ConfigType
 
-from .const import CONF_DEVICE_SERIAL_NUMBER, CONF_INVERTER_SERIAL_NUMBER
-from .coordinator import TrannergyUpdateCoordinator
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_CONNECT_TIMEOUT,
+    CONF_DEVICE_SERIAL_NUMBER,
+    CONF_EXPORT_FLUSH_INTERVAL,
+    CONF_EXPORT_FLUSH_SIZE,
+    CONF_EXPORT_FORMAT,
+    CONF_FLEET_CONCURRENCY,
+    CONF_FLEET_MODE,
+    CONF_FLEET_WORKERS,
+    CONF_HISTORY_SIZE,
+    CONF_INVERTER_SERIAL_NUMBER,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PUSH_MODE,
+    CONF_PUSH_PORT,
+    CONF_READ_TIMEOUT,
+    DEFAULT_EXPORT_FLUSH_INTERVAL,
+    DEFAULT_EXPORT_FLUSH_SIZE,
+    DEFAULT_FLEET_CONCURRENCY,
+    DEFAULT_FLEET_WORKERS,
+    DEFAULT_HISTORY_SIZE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_PUSH_PORT,
+    EXPORT_DISABLED,
+)
+from .coordinator import STORAGE_VERSION, TrannergyUpdateCoordinator
+from .exporter import TrannergyExporter
+from .fleet import async_get_fleet
+from .push import async_get_push_receiver
+from .ringbuffer import TrannergyRingBuffer
+from .scheduler import TrannergyPollScheduler
+from .services import async_setup_services
+from .sharded import async_get_shard_pool
+from .trannergy import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [Platform.SENSOR]
@@ -16,6 +56,17 @@ type TrannergyConfigEntry = ConfigEntry[TrannergyUpdateCoordinator]
 
 DOMAIN = "trannergy"
 
+# A reading handed over by the config flow is used when it is at most this old
+INITIAL_DATA_MAX_AGE = 300
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Trannergy services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: TrannergyConfigEntry) -> bool:
     """Set up platform from a ConfigEntry."""
@@ -24,18 +75,114 @@ async def async_setup_entry(hass: HomeAssistant, entry: TrannergyConfigEntry) ->
     device_serial_number = entry.data.get(CONF_DEVICE_SERIAL_NUMBER)
     inverter_serial_number = entry.data.get(CONF_INVERTER_SERIAL_NUMBER)
     update_interval = datetime.timedelta(seconds=entry.data.get(CONF_SCAN_INTERVAL))
+    push_mode = entry.options.get(CONF_PUSH_MODE, False)
+    fleet_mode = entry.options.get(CONF_FLEET_MODE, False) and not push_mode
+
+    scheduler = None
+    if entry.options.get(CONF_ADAPTIVE_POLLING, False):
+        scheduler = TrannergyPollScheduler(
+            update_interval,
+            datetime.timedelta(
+                seconds=entry.options.get(
+                    CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                )
+            ),
+            datetime.timedelta(
+                seconds=entry.options.get(
+                    CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                )
+            ),
+        )
 
     coordinator = TrannergyUpdateCoordinator(
         hass,
+        entry,
         ip_address,
         port,
         device_serial_number,
         inverter_serial_number,
         update_interval,
+        fleet_mode,
+        scheduler,
+        entry.options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+        entry.options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT),
+        push_mode,
     )
 
-    # Sync with Coordinator
-    await coordinator.async_config_entry_first_refresh()
+    # Poll and decode in a worker process, away from the event loop
+    if fleet_mode and (
+        workers := entry.options.get(CONF_FLEET_WORKERS, DEFAULT_FLEET_WORKERS)
+    ):
+        coordinator.trannergy = async_get_shard_pool(hass).async_add(
+            coordinator.trannergy, workers
+        )
+    # Close the connection, or give the inverter back to the pool, also when
+    # the setup fails
+    entry.async_on_unload(coordinator.trannergy.async_close)
+
+    # Sync with Coordinator, pushed telegrams arrive when the Wi-Fi module sends them
+    await coordinator.async_load_state()
+    initial = (
+        hass.data.get(DOMAIN, {})
+        .get("initial_data", {})
+        .pop(inverter_serial_number, None)
+    )
+
+    # Let the fleet poller schedule the polls, the first refresh included
+    if fleet_mode:
+        fleet = async_get_fleet(hass)
+        fleet.async_register(
+            entry.entry_id,
+            coordinator,
+            entry.options.get(CONF_FLEET_CONCURRENCY, DEFAULT_FLEET_CONCURRENCY),
+        )
+        entry.async_on_unload(lambda: fleet.async_unregister(entry.entry_id))
+
+    if initial is not None and time.monotonic() - initial[0] < INITIAL_DATA_MAX_AGE:
+        coordinator.async_set_initial_data(initial[1])
+    elif coordinator.async_set_cached_data():
+        # Start from the stored reading and poll without holding up the setup
+        if not push_mode and not fleet_mode:
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+            )
+    elif fleet_mode:
+        await async_get_fleet(hass).async_first_refresh(entry.entry_id)
+    elif not push_mode:
+        await coordinator.async_config_entry_first_refresh()
+
+    # Keep every reading in a ring buffer on disk
+    if history_size := entry.options.get(CONF_HISTORY_SIZE, DEFAULT_HISTORY_SIZE):
+        history = TrannergyRingBuffer(_history_path(hass, entry), history_size)
+        await hass.async_add_executor_job(history.open)
+        coordinator.history = history
+
+    # Export every reading to files for other tools
+    export_format = entry.options.get(CONF_EXPORT_FORMAT, EXPORT_DISABLED)
+    if export_format != EXPORT_DISABLED:
+        exporter = TrannergyExporter(
+            hass.config.path(DOMAIN, "export"),
+            inverter_serial_number,
+            export_format,
+            entry.options.get(CONF_EXPORT_FLUSH_SIZE, DEFAULT_EXPORT_FLUSH_SIZE),
+            entry.options.get(
+                CONF_EXPORT_FLUSH_INTERVAL, DEFAULT_EXPORT_FLUSH_INTERVAL
+            ),
+        )
+        try:
+            await hass.async_add_executor_job(exporter.start)
+        except ImportError as err:
+            _LOGGER.error("Cannot export to %s: %s", export_format, err)
+        else:
+            coordinator.exporter = exporter
+
+    # Let the push receiver hand over the telegrams of this inverter
+    if push_mode:
+        receiver = async_get_push_receiver(
+            hass, entry.options.get(CONF_PUSH_PORT, DEFAULT_PUSH_PORT)
+        )
+        await receiver.async_register(inverter_serial_number, coordinator)
+        entry.async_on_unload(lambda: receiver.async_unregister(inverter_serial_number))
 
     # Store Entity and Initialize Platforms
     entry.runtime_data = coordinator
@@ -48,6 +195,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: TrannergyConfigEntry) ->
     return True
 
 
+async def async_unload_entry(hass: HomeAssistant, entry: TrannergyConfigEntry) -> bool:
+    """Unload a config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        await entry.runtime_data.async_shutdown()
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the history and stored state of a deleted config entry."""
+
+    def _remove() -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(_history_path(hass, entry))
+
+    await hass.async_add_executor_job(_remove)
+    for name in ("energy", "reading"):
+        store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.{name}")
+        await store.async_remove()
+
+
+def _history_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return the path of the history ring buffer of a config entry."""
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.ring")
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
     await hass.config_entries.async_reload(entry.entry_id)
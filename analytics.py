@@ -0,0 +1,213 @@
+"""Vectorized analysis of buffered Trannergy readings."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import math
+from typing import TYPE_CHECKING, Any
+import warnings
+
+from .derived import MAX_INTEGRATION_GAP
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Strings are only compared while they produce at least this much together, in W
+MIN_STRING_POWER = 50.0
+
+# Robust z-scores beyond this mark a sample as an anomaly
+ANOMALY_THRESHOLD = 3.5
+
+# Scale the median and mean absolute deviation to the standard deviation
+_MAD_SCALE = 0.6745
+_MEAN_AD_SCALE = 1.2533
+
+_STRINGS = (1, 2, 3)
+
+
+def day_index(times: np.ndarray, utc_offset: float = 0.0) -> np.ndarray:
+    """Return the local day number of every timestamp."""
+    import numpy as np
+
+    return np.floor((times + utc_offset) / 86400).astype(np.int64)
+
+
+def active_strings(samples: np.ndarray) -> tuple[int, ...]:
+    """Return the PV strings that ever had a voltage."""
+    return tuple(n for n in _STRINGS if samples[f"voltage_pv{n}"].max(initial=0) > 0)
+
+
+def string_mismatch(samples: np.ndarray, strings: tuple[int, ...]) -> np.ndarray:
+    """Return the deviation of every string from the mean of the strings.
+
+    The result has a row per sample and a column per string, holding the
+    relative deviation of the string's DC power from the mean, or NaN while
+    the strings produce too little to compare.
+    """
+    import numpy as np
+
+    power = np.stack(
+        [
+            samples[f"voltage_pv{n}"].astype(np.float64) * samples[f"ampere_pv{n}"]
+            for n in strings
+        ],
+        axis=1,
+    )
+    mean = power.mean(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = power / mean - 1
+    ratio[(mean * len(strings) < MIN_STRING_POWER).ravel()] = np.nan
+    return ratio
+
+
+def robust_zscores(values: np.ndarray) -> np.ndarray:
+    """Return robust z-scores, based on the median and median absolute deviation."""
+    import numpy as np
+
+    median = np.nanmedian(values)
+    deviation = np.abs(values - median)
+    mad = np.nanmedian(deviation)
+    if np.isfinite(mad) and mad > 0:
+        return _MAD_SCALE * (values - median) / mad
+
+    # Mostly identical values, fall back to the mean absolute deviation
+    mean = np.nanmean(deviation)
+    if not np.isfinite(mean) or mean == 0:
+        return np.zeros_like(values)
+    return (values - median) / (_MEAN_AD_SCALE * mean)
+
+
+def daily_energy(
+    times: np.ndarray, power: np.ndarray, days: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the days and the energy produced on each, in Wh.
+
+    The power is integrated with the trapezoid rule, leaving out gaps between
+    samples longer than MAX_INTEGRATION_GAP and intervals spanning midnight.
+    """
+    import numpy as np
+
+    if len(times) < 2:
+        return np.empty(0, np.int64), np.empty(0)
+
+    elapsed = np.diff(times)
+    area = (power[1:] + power[:-1]) / 2 * elapsed / 3600
+    valid = (days[1:] == days[:-1]) & (elapsed > 0) & (elapsed <= MAX_INTEGRATION_GAP)
+    first = days[0]
+    energy = np.bincount(
+        days[1:][valid] - first,
+        weights=area[valid],
+        minlength=days[-1] - first + 1,
+    )
+    return np.arange(first, days[-1] + 1), energy
+
+
+def yield_index(energy: np.ndarray) -> np.ndarray:
+    """Normalize a matrix of daily energy, a row per inverter and column per day.
+
+    With several inverters every day is divided by the median of all of them,
+    which cancels out the weather they share. A single inverter is compared
+    with its own best days instead. Days without production are NaN.
+    """
+    import numpy as np
+
+    energy = np.where(energy > 0, energy, np.nan)
+    with np.errstate(invalid="ignore"):
+        if len(energy) > 1:
+            reference = np.nanmedian(energy, axis=0)
+        elif np.isfinite(energy).any():
+            reference = np.nanpercentile(energy, 90)
+        else:
+            return energy
+        return energy / reference
+
+
+def trend_per_year(days: np.ndarray, index: np.ndarray) -> float | None:
+    """Return the linear trend of a yield index, in index points per year."""
+    import numpy as np
+
+    finite = np.isfinite(index)
+    if finite.sum() < 2:
+        return None
+    slope = np.polyfit(days[finite], index[finite], 1)[0]
+    return float(slope * 365)
+
+
+def analyze(
+    histories: Mapping[str, np.ndarray], utc_offset: float = 0.0
+) -> dict[str, dict[str, Any]]:
+    """Analyze the buffered readings of a fleet of inverters.
+
+    Every history is a structured array with a time field and the fields of
+    the ring buffer. The result holds per inverter the string mismatch, the
+    anomalies in it, the latest normalized yield and its trend.
+    """
+    # Days or samples without production are NaN, which is expected here
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return _analyze(histories, utc_offset)
+
+
+def _analyze(
+    histories: Mapping[str, np.ndarray], utc_offset: float
+) -> dict[str, dict[str, Any]]:
+    """Analyze the buffered readings of a fleet of inverters."""
+    import numpy as np
+
+    results: dict[str, dict[str, Any]] = {}
+    daily: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for key, samples in histories.items():
+        times = samples["time"]
+        days = day_index(times, utc_offset)
+        power = (
+            samples["power_ac1"].astype(np.float64)
+            + samples["power_ac2"]
+            + samples["power_ac3"]
+        )
+        daily[key] = daily_energy(times, power, days)
+
+        result: dict[str, Any] = {"samples": len(samples)}
+        strings = active_strings(samples) if len(samples) else ()
+        if len(strings) > 1:
+            mismatch = string_mismatch(samples, strings)
+            spread = np.nanmax(np.abs(mismatch), axis=1, initial=0)
+            spread[np.isnan(mismatch).all(axis=1)] = np.nan
+            scores = robust_zscores(spread)
+            with np.errstate(invalid="ignore"):
+                anomalies = np.abs(scores) > ANOMALY_THRESHOLD
+            result["string_mismatch"] = {
+                f"pv{n}": _rounded(np.nanmedian(mismatch[:, column]) * 100)
+                for column, n in enumerate(strings)
+            }
+            result["anomalies"] = int(anomalies.sum())
+            result["last_anomaly"] = (
+                float(times[np.flatnonzero(anomalies)[-1]]) if anomalies.any() else None
+            )
+        results[key] = result
+
+    # Align the daily energy of all inverters on one range of days
+    spans = [days for days, _ in daily.values() if len(days)]
+    if not spans:
+        return results
+    first = min(days[0] for days in spans)
+    all_days = np.arange(first, max(days[-1] for days in spans) + 1)
+    energy = np.zeros((len(daily), len(all_days)))
+    for row, (days, values) in enumerate(daily.values()):
+        energy[row, days - first] = values
+
+    index = yield_index(energy)
+    for row, key in enumerate(daily):
+        finite = np.flatnonzero(np.isfinite(index[row]))
+        results[key]["yield_index"] = (
+            _rounded(index[row, finite[-1]]) if len(finite) else None
+        )
+        trend = trend_per_year(all_days, index[row])
+        results[key]["yield_trend_per_year"] = (
+            None if trend is None else _rounded(trend)
+        )
+    return results
+
+
+def _rounded(value: float) -> float | None:
+    """Return a value rounded for a service response, None if it is not finite."""
+    return round(float(value), 3) if math.isfinite(value) else None
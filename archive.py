@@ -0,0 +1,109 @@
+"""Bulk decoding of recorded Trannergy telegrams."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from .trannergy import (
+    FRAME_OVERHEAD,
+    FRAME_START,
+    TELEGRAM_FIELDS,
+    TELEGRAM_MIN_LENGTH,
+    ReadTrannergyDataError,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy equivalents of the struct formats used in TELEGRAM_FIELDS
+_NUMPY_FORMATS = {"B": "u1", "H": ">u2", "I": ">u4"}
+
+
+def _numpy_format(fmt: str) -> str:
+    """Return the NumPy format of a struct format."""
+    if fmt.endswith("s"):
+        return f"S{fmt[:-1]}"
+    return _NUMPY_FORMATS[fmt]
+
+
+def raw_dtype(frame_size: int) -> np.dtype:
+    """Return a structured dtype viewing the raw fields of fixed-size frames."""
+    import numpy as np
+
+    return np.dtype(
+        {
+            "names": ["start", *(field.name for field in TELEGRAM_FIELDS)],
+            "formats": [
+                "u1",
+                *(_numpy_format(field.fmt) for field in TELEGRAM_FIELDS),
+            ],
+            "offsets": [0, *(field.offset for field in TELEGRAM_FIELDS)],
+            "itemsize": frame_size,
+        }
+    )
+
+
+def reading_dtype() -> np.dtype:
+    """Return the structured dtype of decoded readings."""
+    import numpy as np
+
+    formats = []
+    for field in TELEGRAM_FIELDS:
+        if field.fmt.endswith("s"):
+            formats.append(_numpy_format(field.fmt))
+        elif field.divisor is not None:
+            formats.append("f8")
+        else:
+            formats.append("i8")
+    return np.dtype(
+        {"names": [field.name for field in TELEGRAM_FIELDS], "formats": formats}
+    )
+
+
+def decode_archive(
+    source: bytes | bytearray | memoryview | str | os.PathLike[str],
+    frame_size: int | None = None,
+) -> np.ndarray:
+    """Decode an archive of back-to-back, fixed-size telegrams.
+
+    The source is a buffer or the path of a file, which is memory-mapped. The
+    frame size is read from the first telegram's header when not given. The
+    result is a structured array with one record per telegram, using the field
+    names and scaling of decode_telegram(). The msg and serial fields are kept
+    as raw bytes.
+    """
+    import numpy as np
+
+    if isinstance(source, (str, os.PathLike)):
+        buffer = np.memmap(source, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.frombuffer(source, dtype=np.uint8)
+
+    if len(buffer) == 0:
+        return np.empty(0, dtype=reading_dtype())
+
+    if frame_size is None:
+        frame_size = int(buffer[1]) + FRAME_OVERHEAD
+    if frame_size < TELEGRAM_MIN_LENGTH:
+        raise ReadTrannergyDataError(f"Frame size {frame_size} is too short")
+    if len(buffer) % frame_size:
+        raise ReadTrannergyDataError(
+            f"Archive of {len(buffer)} bytes is not a multiple of {frame_size}"
+        )
+
+    frames = buffer.view(raw_dtype(frame_size))
+    if not np.all(frames["start"] == FRAME_START):
+        raise ReadTrannergyDataError("Archive contains misaligned telegrams")
+
+    readings = np.empty(len(frames), dtype=reading_dtype())
+    for field in TELEGRAM_FIELDS:
+        if field.fmt.endswith("s"):
+            readings[field.name] = frames[field.name]
+        elif field.divisor is not None:
+            np.divide(frames[field.name], field.divisor, out=readings[field.name])
+        else:
+            readings[field.name] = (
+                frames[field.name].astype(np.int64) * field.multiplier
+            )
+    return readings
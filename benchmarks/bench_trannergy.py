@@ -0,0 +1,215 @@
+"""Benchmarks for the Trannergy integration.
+
+Measures request building, frame parsing and decoding, a full poll round trip
+against a simulated logger on localhost and the coordinator update of many
+sensors. Results are printed, or written with --output, as JSON. Run from a
+Home Assistant development environment:
+
+    python benchmarks/bench_trannergy.py --output results.json
+
+The run fails when a mean exceeds its limit in thresholds.json, or exceeds the
+mean in a --baseline result file by more than --tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+import importlib
+import json
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+THRESHOLDS = Path(__file__).with_name("thresholds.json")
+
+# The integration is imported as a package named after its directory
+sys.path.insert(0, str(ROOT.parent))
+trannergy = importlib.import_module(f"{ROOT.name}.trannergy")
+simulator = importlib.import_module(f"{ROOT.name}.simulator")
+
+DEVICE_SERIAL = 602123456
+INVERTER_SERIAL = "NLBN1234567890AB"
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    """Summarize timings, in microseconds."""
+    samples = sorted(sample * 1e6 for sample in samples)
+    return {
+        "runs": len(samples),
+        "mean_us": statistics.fmean(samples),
+        "median_us": statistics.median(samples),
+        "p95_us": samples[int(len(samples) * 0.95) - 1],
+        "max_us": samples[-1],
+    }
+
+
+def bench(func: Callable[[], Any], runs: int, batch: int = 100) -> dict[str, float]:
+    """Time a function, in batches to keep timer overhead out."""
+    samples = []
+    for _ in range(max(1, runs // batch)):
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        samples.append((time.perf_counter() - start) / batch)
+    return _summary(samples)
+
+
+async def async_bench(
+    func: Callable[[], Awaitable[Any]], runs: int
+) -> dict[str, float]:
+    """Time a coroutine function, one call per sample."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+
+async def bench_round_trip(runs: int) -> dict[str, float]:
+    """Time getdata() polls over a persistent connection to a simulated logger."""
+    logger = simulator.TrannergySimulator(DEVICE_SERIAL, INVERTER_SERIAL)
+    await logger.async_start()
+    # Without sharing, every poll is a round trip
+    client = trannergy.ReadTrannergyData(
+        "127.0.0.1", logger.port, INVERTER_SERIAL, str(DEVICE_SERIAL), share_ttl=0
+    )
+    try:
+        return await async_bench(client.async_getdata, runs)
+    finally:
+        await client.async_close()
+        await logger.async_stop()
+
+
+async def bench_coordinator(runs: int, sensors: int) -> dict[str, float]:
+    """Time coordinator updates fanned out to many sensors."""
+    from homeassistant.core import HomeAssistant
+
+    coordinator_module = importlib.import_module(f"{ROOT.name}.coordinator")
+    sensor_module = importlib.import_module(f"{ROOT.name}.sensor")
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        coordinator = coordinator_module.TrannergyUpdateCoordinator(
+            hass,
+            None,
+            "127.0.0.1",
+            8899,
+            DEVICE_SERIAL,
+            INVERTER_SERIAL,
+            timedelta(seconds=60),
+            fleet_mode=True,
+        )
+        values = simulator.synthesize_values()
+        coordinator.async_set_updated_data(
+            trannergy.decode_telegram(
+                trannergy.encode_telegram(values, DEVICE_SERIAL, INVERTER_SERIAL)
+            ).extend(trannergy.READING_FIELDS)
+        )
+
+        # Entities are not added to Home Assistant, only their update is timed
+        descriptions = sensor_module.SENSOR_TYPES
+        writes = 0
+
+        def _count_write() -> None:
+            nonlocal writes
+            writes += 1
+
+        for index in range(sensors):
+            entity = sensor_module.TrannergySensor(
+                coordinator, descriptions[index % len(descriptions)]
+            )
+            entity.async_write_ha_state = _count_write
+            coordinator.async_add_listener(entity._handle_coordinator_update)
+
+        telegrams = [
+            trannergy.decode_telegram(
+                trannergy.encode_telegram(
+                    {**values, "power_ac1": values["power_ac1"] + step * 10},
+                    DEVICE_SERIAL,
+                    INVERTER_SERIAL,
+                )
+            ).extend(trannergy.READING_FIELDS)
+            for step in range(runs)
+        ]
+        readings = iter(telegrams)
+        result = bench(
+            lambda: coordinator.async_set_updated_data(next(readings)), runs, 1
+        )
+        result["state_writes"] = writes
+        await hass.async_stop(force=True)
+        return result
+
+
+def check(
+    results: dict[str, dict[str, float]],
+    thresholds: dict[str, float],
+    baseline: dict[str, dict[str, float]] | None,
+    tolerance: float,
+) -> list[str]:
+    """Return the regressions found in the results."""
+    regressions = []
+    for name, result in results.items():
+        mean = result["mean_us"]
+        if (limit := thresholds.get(name)) is not None and mean > limit:
+            regressions.append(f"{name}: {mean:.1f} us exceeds limit {limit:.1f} us")
+        if baseline and name in baseline:
+            previous = baseline[name]["mean_us"]
+            if mean > previous * tolerance:
+                regressions.append(
+                    f"{name}: {mean:.1f} us is slower than baseline {previous:.1f} us"
+                )
+    return regressions
+
+
+async def async_run(runs: int) -> dict[str, dict[str, float]]:
+    """Run all benchmarks."""
+    frame = trannergy.encode_telegram(
+        simulator.synthesize_values(), DEVICE_SERIAL, INVERTER_SERIAL
+    )
+    parser = trannergy.TelegramFrameParser()
+    return {
+        "build_request": bench(lambda: trannergy.build_request(DEVICE_SERIAL), runs),
+        "decode_telegram": bench(lambda: trannergy.decode_telegram(frame), runs),
+        "frame_parser": bench(lambda: parser.feed(frame), runs),
+        "poll_round_trip": await bench_round_trip(max(10, runs // 100)),
+        "coordinator_update_100_sensors": await bench_coordinator(
+            max(10, runs // 100), 100
+        ),
+    }
+
+
+def main() -> int:
+    """Run the benchmarks and report regressions."""
+    parser = argparse.ArgumentParser(description="Trannergy benchmarks")
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--output", type=Path, help="write results to this file")
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = asyncio.run(async_run(args.runs))
+    report = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    regressions = check(
+        results, json.loads(THRESHOLDS.read_text()), baseline, args.tolerance
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
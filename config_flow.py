@@ -2,67 +2,272 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import (
     CONF_IP_ADDRESS,
     CONF_NAME,
     CONF_PORT,
     CONF_SCAN_INTERVAL,
 )
-from homeassistant.exceptions import HomeAssistantError
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
 
-from .const import CONF_DEVICE_SERIAL_NUMBER, CONF_INVERTER_SERIAL_NUMBER, DOMAIN, NAME
-from .trannergy import ReadTrannergyData
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_CONNECT_TIMEOUT,
+    CONF_DEVICE_SERIAL_NUMBER,
+    CONF_EXPORT_FLUSH_INTERVAL,
+    CONF_EXPORT_FLUSH_SIZE,
+    CONF_EXPORT_FORMAT,
+    CONF_FLEET_CONCURRENCY,
+    CONF_FLEET_MODE,
+    CONF_FLEET_WORKERS,
+    CONF_HISTORY_SIZE,
+    CONF_INVERTER_SERIAL_NUMBER,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PUSH_MODE,
+    CONF_PUSH_PORT,
+    CONF_READ_TIMEOUT,
+    DEFAULT_EXPORT_FLUSH_INTERVAL,
+    DEFAULT_EXPORT_FLUSH_SIZE,
+    DEFAULT_FLEET_CONCURRENCY,
+    DEFAULT_FLEET_WORKERS,
+    DEFAULT_HISTORY_SIZE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_PUSH_PORT,
+    DOMAIN,
+    EXPORT_DISABLED,
+    NAME,
+)
+from .discovery import DEFAULT_PORT, DiscoveredLogger, async_discover
+from .exporter import EXPORT_FORMATS
+from .trannergy import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    ReadTrannergyData,
+    ReadTrannergyDataError,
+    TrannergyConnectionError,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+CONF_DEVICE = "device"
+MANUAL_ENTRY = "manual"
 
-class ReadTrannergyDataError(HomeAssistantError):
-    """Error reading trannergy data."""
+# Deadline for the reading that validates the connection details, in seconds
+VALIDATION_TIMEOUT = 20.0
 
 
 class TrannergyConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Trannergy."""
 
-    async def async_step_user(self, user_input) -> ConfigFlowResult:
-        """Handle the initial step."""
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> TrannergyOptionsFlow:
+        """Get the options flow for this handler."""
+        return TrannergyOptionsFlow()
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._discovered: dict[str, DiscoveredLogger] = {}
+        self._defaults: dict[str, Any] = {}
+
+    async def async_step_user(self, user_input=None) -> ConfigFlowResult:
+        """Handle the initial step, looking for loggers on the network first."""
+        entries = self._async_current_entries()
+        self._discovered = {
+            logger.device_serial_number: logger
+            for logger in await async_discover(
+                known_hosts={entry.data.get(CONF_IP_ADDRESS) for entry in entries},
+                known_serials={
+                    str(entry.data.get(CONF_DEVICE_SERIAL_NUMBER)) for entry in entries
+                },
+            )
+        }
+        if self._discovered:
+            return await self.async_step_pick_device()
+        return await self.async_step_manual()
+
+    async def async_step_pick_device(self, user_input=None) -> ConfigFlowResult:
+        """Let the user pick one of the discovered loggers."""
+        if user_input is not None:
+            if (logger := self._discovered.get(user_input[CONF_DEVICE])) is not None:
+                self._defaults = {
+                    CONF_IP_ADDRESS: logger.ip_address,
+                    CONF_DEVICE_SERIAL_NUMBER: logger.device_serial_number,
+                    CONF_INVERTER_SERIAL_NUMBER: logger.inverter_serial_number or "",
+                }
+            return await self.async_step_manual()
+
+        devices = {
+            serial: f"{logger.inverter_serial_number or serial} ({logger.ip_address})"
+            for serial, logger in self._discovered.items()
+        }
+        devices[MANUAL_ENTRY] = "Enter manually"
+        return self.async_show_form(
+            step_id="pick_device",
+            data_schema=vol.Schema({vol.Required(CONF_DEVICE): vol.In(devices)}),
+        )
+
+    async def async_step_manual(self, user_input=None) -> ConfigFlowResult:
+        """Handle the connection details, filled in for a discovered logger."""
         errors: dict[str, str] = {}
 
         if user_input is not None:
+            inverter_serial = user_input[CONF_INVERTER_SERIAL_NUMBER]
+            await self.async_set_unique_id(inverter_serial)
+            self._abort_if_unique_id_configured()
+
+            trannergy = ReadTrannergyData(
+                inverter_ip=user_input.get(CONF_IP_ADDRESS),
+                inverter_port=user_input.get(CONF_PORT),
+                device_serial_number=user_input.get(CONF_DEVICE_SERIAL_NUMBER),
+                inverter_serial=inverter_serial,
+            )
             try:
-                trannergy = ReadTrannergyData(
-                    inverter_ip=user_input.get(CONF_IP_ADDRESS),
-                    inverter_port=user_input.get(CONF_PORT),
-                    device_serial_number=user_input.get(CONF_DEVICE_SERIAL_NUMBER),
-                    inverter_serial=user_input.get(CONF_INVERTER_SERIAL_NUMBER),
-                )
-                data = trannergy.getdata()
-                _LOGGER.info(data)
-            except Exception as e:
+                async with asyncio.timeout(VALIDATION_TIMEOUT):
+                    data = await trannergy.async_getdata()
+            except (TimeoutError, TrannergyConnectionError) as err:
+                _LOGGER.debug("Cannot connect to the Wi-Fi module: %s", err)
+                errors["base"] = "cannot_connect"
+            except ReadTrannergyDataError as err:
+                _LOGGER.debug("Invalid reply from the Wi-Fi module: %s", err)
+                errors["base"] = "invalid_reply"
+            except Exception:
                 _LOGGER.exception("Unexpected exception")
-                errors["base"] = "Error: " + str(e)
+                errors["base"] = "unknown"
             else:
+                # Hand the reading to the coordinator, sparing it the first poll
+                self.hass.data.setdefault(DOMAIN, {}).setdefault("initial_data", {})[
+                    inverter_serial
+                ] = (time.monotonic(), data)
                 return self.async_create_entry(
                     title=user_input.get(CONF_NAME, NAME),
                     data=user_input,
                 )
+            finally:
+                await trannergy.async_close()
 
+        defaults = self._defaults
         return self.async_show_form(
-            step_id="user",
+            step_id="manual",
             data_schema=vol.Schema(
                 {
                     vol.Required(CONF_NAME, default=NAME): cv.string,
-                    vol.Required(CONF_IP_ADDRESS, default=""): cv.string,
-                    vol.Optional(CONF_PORT, default=8899): cv.positive_int,
-                    vol.Required(CONF_DEVICE_SERIAL_NUMBER, default=""): cv.string,
-                    vol.Required(CONF_INVERTER_SERIAL_NUMBER, default=""): cv.string,
+                    vol.Required(
+                        CONF_IP_ADDRESS, default=defaults.get(CONF_IP_ADDRESS, "")
+                    ): cv.string,
+                    vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.positive_int,
+                    vol.Required(
+                        CONF_DEVICE_SERIAL_NUMBER,
+                        default=defaults.get(CONF_DEVICE_SERIAL_NUMBER, ""),
+                    ): cv.string,
+                    vol.Required(
+                        CONF_INVERTER_SERIAL_NUMBER,
+                        default=defaults.get(CONF_INVERTER_SERIAL_NUMBER, ""),
+                    ): cv.string,
                     vol.Optional(CONF_SCAN_INTERVAL, default=60): cv.positive_int,
                 }
             ),
             errors=errors,
         )
+
+
+class TrannergyOptionsFlow(OptionsFlow):
+    """Handle the options of a Trannergy config entry."""
+
+    async def async_step_init(self, user_input=None) -> ConfigFlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_FLEET_MODE,
+                        default=options.get(CONF_FLEET_MODE, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_FLEET_CONCURRENCY,
+                        default=options.get(
+                            CONF_FLEET_CONCURRENCY, DEFAULT_FLEET_CONCURRENCY
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_FLEET_WORKERS,
+                        default=options.get(CONF_FLEET_WORKERS, DEFAULT_FLEET_WORKERS),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        default=options.get(CONF_ADAPTIVE_POLLING, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_MIN_SCAN_INTERVAL,
+                        default=options.get(
+                            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_MAX_SCAN_INTERVAL,
+                        default=options.get(
+                            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_CONNECT_TIMEOUT,
+                        default=options.get(
+                            CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+                        ),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_READ_TIMEOUT,
+                        default=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_HISTORY_SIZE,
+                        default=options.get(CONF_HISTORY_SIZE, DEFAULT_HISTORY_SIZE),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_PUSH_MODE,
+                        default=options.get(CONF_PUSH_MODE, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_PUSH_PORT,
+                        default=options.get(CONF_PUSH_PORT, DEFAULT_PUSH_PORT),
+                    ): cv.port,
+                    vol.Optional(
+                        CONF_EXPORT_FORMAT,
+                        default=options.get(CONF_EXPORT_FORMAT, EXPORT_DISABLED),
+                    ): vol.In((EXPORT_DISABLED, *EXPORT_FORMATS)),
+                    vol.Optional(
+                        CONF_EXPORT_FLUSH_SIZE,
+                        default=options.get(
+                            CONF_EXPORT_FLUSH_SIZE, DEFAULT_EXPORT_FLUSH_SIZE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Optional(
+                        CONF_EXPORT_FLUSH_INTERVAL,
+                        default=options.get(
+                            CONF_EXPORT_FLUSH_INTERVAL, DEFAULT_EXPORT_FLUSH_INTERVAL
+                        ),
+                    ): cv.positive_int,
+                }
+            ),
+        )
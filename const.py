@@ -5,3 +5,26 @@ MANUFACTURER = "Trannergy"
 DOMAIN = "trannergy"
 CONF_DEVICE_SERIAL_NUMBER = "device_serial_number"
 CONF_INVERTER_SERIAL_NUMBER = "inverter_serial_number"
+CONF_FLEET_MODE = "fleet_mode"
+CONF_FLEET_CONCURRENCY = "fleet_concurrency"
+DEFAULT_FLEET_CONCURRENCY = 4
+CONF_FLEET_WORKERS = "fleet_workers"
+DEFAULT_FLEET_WORKERS = 0
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+DEFAULT_MIN_SCAN_INTERVAL = 10
+DEFAULT_MAX_SCAN_INTERVAL = 3600
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_HISTORY_SIZE = "history_size"
+DEFAULT_HISTORY_SIZE = 120960
+CONF_PUSH_MODE = "push_mode"
+CONF_PUSH_PORT = "push_port"
+DEFAULT_PUSH_PORT = 10000
+CONF_EXPORT_FORMAT = "export_format"
+CONF_EXPORT_FLUSH_SIZE = "export_flush_size"
+CONF_EXPORT_FLUSH_INTERVAL = "export_flush_interval"
+EXPORT_DISABLED = "none"
+DEFAULT_EXPORT_FLUSH_SIZE = 100
+DEFAULT_EXPORT_FLUSH_INTERVAL = 60
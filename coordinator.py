@@ -2,28 +2,59 @@
 
 from datetime import timedelta
 import logging
+import time
 from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
-from .trannergy import ReadTrannergyData, TrannergyConnectionError
+from .derived import TrannergyEnergyIntegrator, add_derived_values
+from .exporter import TrannergyExporter
+from .profiler import TrannergyProfiler
+from .ringbuffer import TrannergyRingBuffer
+from .scheduler import TrannergyPollScheduler
+from .sharded import TrannergyShardClient
+from .trannergy import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    READING_FIELDS,
+    ReadTrannergyData,
+    ReadTrannergyDataError,
+    TrannergyError,
+    TrannergyReading,
+    decode_telegram,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+STORAGE_VERSION = 1
 
-class TrannergyUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+# Delay before the integrated energy and last reading are written, in seconds
+ENERGY_SAVE_DELAY = 60
+READING_SAVE_DELAY = 60
+
+
+class TrannergyUpdateCoordinator(DataUpdateCoordinator[TrannergyReading]):
     """The Trannergy update coordinator."""
 
     def __init__(
         self,
         hass: HomeAssistant,
+        entry: ConfigEntry | None,
         ip_address: str,
         port: int,
         device_serial_number: int,
         inverter_serial_number: int,
         update_interval: timedelta,
+        fleet_mode: bool = False,
+        scheduler: TrannergyPollScheduler | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        push_mode: bool = False,
     ) -> None:
         """Initialize."""
         self.ip_address = ip_address
@@ -31,25 +62,223 @@ class TrannergyUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         self.device_serial_number = device_serial_number
         self.inverter_serial_number = inverter_serial_number
 
-        self.trannergy = ReadTrannergyData(
+        # In fleet mode the fleet poller schedules the polls, not the coordinator
+        self.scan_interval = update_interval
+        self.fleet_mode = fleet_mode
+
+        # In push mode the Wi-Fi module sends its telegrams without being polled
+        self.push_mode = push_mode
+
+        # Adapts the polling interval to the inverter's state when set
+        self.scheduler = scheduler
+
+        # High resolution history of every reading, when enabled
+        self.history: TrannergyRingBuffer | None = None
+
+        # Writes every reading to files for other tools, when enabled
+        self.exporter: TrannergyExporter | None = None
+
+        # Profiles the next poll cycles, set by the profile service
+        self.profiler: TrannergyProfiler | None = None
+
+        # AC energy integrated from every reading, stored across restarts
+        self.integrator = TrannergyEnergyIntegrator()
+        self._energy_store: Store[dict[str, Any]] | None = None
+
+        # Last good reading, shown as stale after a restart until a poll succeeds
+        self.stale = False
+        self.last_reading_time: float | None = None
+        self._reading_store: Store[dict[str, Any]] | None = None
+        self._cached: dict[str, Any] | None = None
+
+        # Replaced by a client of the shard pool when polling from a worker
+        self.trannergy: ReadTrannergyData | TrannergyShardClient = ReadTrannergyData(
             inverter_ip=self.ip_address,
             inverter_port=self.port,
             device_serial_number=self.device_serial_number,
             inverter_serial=self.inverter_serial_number,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=DOMAIN,
+            update_interval=None if fleet_mode or push_mode else update_interval,
         )
 
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=update_interval)
+        # Without an entry, as in the benchmarks, nothing is stored
+        if entry is not None:
+            entry_id = entry.entry_id
+            self._energy_store = Store(
+                hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.energy"
+            )
+            self._reading_store = Store(
+                hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.reading"
+            )
 
-    async def _async_update_data(self) -> dict[str, Any]:
+    async def async_load_state(self) -> None:
+        """Restore the integrated energy and the last reading."""
+        if self._energy_store is not None and (
+            state := await self._energy_store.async_load()
+        ):
+            self.integrator = TrannergyEnergyIntegrator.from_dict(state)
+        if self._reading_store is not None:
+            self._cached = await self._reading_store.async_load()
+
+    @callback
+    def async_set_cached_data(self) -> bool:
+        """Show the stored reading as stale, returning False if there is none."""
+        if not self._cached:
+            return False
+        self.stale = True
+        self.last_reading_time = self._cached["time"]
+        self.async_set_updated_data(
+            TrannergyReading.from_dict(self._cached["data"], READING_FIELDS)
+        )
+        self._cached = None
+        return True
+
+    async def _async_update_data(self) -> TrannergyReading:
         """Fetch updated data from the Trannergy inverter."""
+        return await self.async_fetch_data()
+
+    async def async_fetch_data(self) -> TrannergyReading:
+        """Poll the inverter, raising UpdateFailed on errors."""
+        if self.profiler is not None:
+            self.profiler.begin()
+
+        data: TrannergyReading | None = None
         try:
-            data = await self.hass.async_add_executor_job(self.trannergy.getdata)
-        except TrannergyConnectionError as err:
-            raise UpdateFailed(err) from err
-        except Exception as err:
+            data = await self.trannergy.async_getdata()
+        except TrannergyError as err:
             raise UpdateFailed(err) from err
+        finally:
+            self._async_adapt_interval(data)
+            # A failed poll ends the cycle, the entities may not be updated
+            if not data and self.profiler is not None:
+                self._async_end_profile()
 
         if not data:
             raise UpdateFailed("No data was returned from the Trannergy inverter")
 
+        return self._async_process(data)
+
+    @callback
+    def async_set_initial_data(self, data: TrannergyReading) -> None:
+        """Start from a reading taken elsewhere, instead of a first poll."""
+        self.async_set_updated_data(self._async_process(data))
+
+    @callback
+    def async_handle_push(self, telegram: bytes) -> None:
+        """Update the listeners with a telegram pushed by the Wi-Fi module."""
+        if self.profiler is not None:
+            self.profiler.begin()
+
+        start = time.perf_counter()
+        try:
+            data = decode_telegram(telegram)
+        except ReadTrannergyDataError as err:
+            self.trannergy.stats.record_failure("decode")
+            self.async_set_update_error(err)
+            if self.profiler is not None:
+                self._async_end_profile()
+            return
+        self.trannergy.stats.record("decode", time.perf_counter() - start)
+
+        self.async_set_updated_data(self._async_process(data))
+
+    @callback
+    def _async_process(self, reading: TrannergyReading) -> TrannergyReading:
+        """Return a reading with the derived values and keep it in the history."""
+        now = time.time()
+        data = reading.extend(READING_FIELDS)
+        add_derived_values(data, self.integrator, now)
+        if self._energy_store is not None:
+            self._energy_store.async_delay_save(
+                self.integrator.as_dict, ENERGY_SAVE_DELAY
+            )
+
+        self.stale = False
+        self.last_reading_time = now
+        if self._reading_store is not None:
+            self._reading_store.async_delay_save(
+                lambda: {"time": now, "data": data.as_dict()}, READING_SAVE_DELAY
+            )
+
+        if self.history is not None:
+            self.history.append(now, data)
+        if self.exporter is not None:
+            self.exporter.submit(now, data)
         return data
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, timing the entity updates."""
+        start = time.perf_counter()
+        super().async_update_listeners()
+        self.trannergy.stats.record("entities", time.perf_counter() - start)
+        if self.profiler is not None:
+            self._async_end_profile()
+
+    @callback
+    def _async_end_profile(self) -> None:
+        """End a profiled cycle, writing the results after the last one."""
+        assert self.profiler is not None
+        if not self.profiler.end():
+            return
+        profiler, self.profiler = self.profiler, None
+        self.hass.async_create_background_task(
+            self._async_write_profile(profiler), f"{DOMAIN} write profile"
+        )
+
+    async def _async_write_profile(self, profiler: TrannergyProfiler) -> None:
+        """Write the results of a profile."""
+        try:
+            paths = await self.hass.async_add_executor_job(profiler.write)
+        except OSError as err:
+            _LOGGER.error("Writing the profile failed: %s", err)
+        else:
+            _LOGGER.info(
+                "Profiled %d cycles of %s, wrote %s and %s",
+                len(profiler.durations),
+                self.ip_address,
+                *paths,
+            )
+
+    @callback
+    def _async_adapt_interval(self, data: TrannergyReading | None) -> None:
+        """Let the scheduler pick the interval until the next poll."""
+        if self.scheduler is None:
+            return
+
+        sun_elevation = next_rising = None
+        if (sun := self.hass.states.get("sun.sun")) is not None:
+            sun_elevation = sun.attributes.get("elevation")
+            if rising := sun.attributes.get("next_rising"):
+                next_rising = dt_util.parse_datetime(rising)
+
+        self.scan_interval = self.scheduler.next_interval(
+            data or None, sun_elevation, next_rising
+        )
+        if not self.fleet_mode:
+            self.update_interval = self.scan_interval
+
+    async def async_shutdown(self) -> None:
+        """Close the connection to the Wi-Fi module on shutdown."""
+        await super().async_shutdown()
+        await self.trannergy.async_close()
+        if self.profiler is not None:
+            self.profiler.abort()
+            self.profiler = None
+        if self._energy_store is not None:
+            await self._energy_store.async_save(self.integrator.as_dict())
+        # Readings may still arrive while the files are closed, detach first
+        if (history := self.history) is not None:
+            self.history = None
+            await self.hass.async_add_executor_job(history.close)
+        if (exporter := self.exporter) is not None:
+            self.exporter = None
+            await self.hass.async_add_executor_job(exporter.stop)
@@ -0,0 +1,41 @@
+"""When the sensors write a new value to the state machine."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+class TrannergyDeadband:
+    """Filters out changes of a value too small to be written.
+
+    A change is written when it exceeds the larger of the absolute and the
+    relative deadband, and the value is written at least every heartbeat
+    seconds, even when it did not change.
+    """
+
+    __slots__ = ("deadband", "heartbeat", "last_write", "relative_deadband")
+
+    def __init__(
+        self,
+        deadband: float,
+        relative_deadband: float,
+        heartbeat: float,
+        last_write: float,
+    ) -> None:
+        """Init, last_write is the monotonic time the value was last written."""
+        self.deadband = deadband
+        self.relative_deadband = relative_deadband
+        self.heartbeat = heartbeat
+        self.last_write = last_write
+
+    def changed(self, value: Any, last: Any) -> bool:
+        """Return True if a value differs meaningfully from the written one."""
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return value != last
+
+        threshold = max(self.deadband, self.relative_deadband * abs(last))
+        return abs(value - last) > threshold or (threshold == 0 and value != last)
+
+    def heartbeat_due(self, now: float) -> bool:
+        """Return True if the value has to be written again by now."""
+        return now - self.last_write >= self.heartbeat
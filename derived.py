@@ -0,0 +1,90 @@
+"""Values derived from Trannergy readings."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .trannergy import FIELD_INDEX, TrannergyReading
+
+# Power is not integrated over gaps between readings longer than this, in seconds
+MAX_INTEGRATION_GAP = 3600.0
+
+_POWER_AC = tuple(FIELD_INDEX[f"power_ac{phase}"] for phase in (1, 2, 3))
+_STRINGS = tuple(
+    (
+        FIELD_INDEX[f"voltage_pv{string}"],
+        FIELD_INDEX[f"ampere_pv{string}"],
+        FIELD_INDEX[f"power_pv{string}"],
+    )
+    for string in (1, 2, 3)
+)
+_POWER_AC_TOTAL = FIELD_INDEX["power_ac_total"]
+_POWER_PV_TOTAL = FIELD_INDEX["power_pv_total"]
+_EFFICIENCY = FIELD_INDEX["efficiency"]
+_ENERGY_INTEGRATED = FIELD_INDEX["energy_integrated"]
+
+
+class TrannergyEnergyIntegrator:
+    """Integrates AC power into energy with the trapezoid rule.
+
+    Every reading adds the area between it and the previous one, so the energy
+    follows each sample instead of the 10 Wh steps of the inverter's counters.
+    The state is a plain dict, so it can be stored and restored on restart.
+    """
+
+    def __init__(
+        self,
+        energy: float = 0.0,
+        last_power: float | None = None,
+        last_time: float | None = None,
+    ) -> None:
+        """Init."""
+        self.energy = energy
+        self.last_power = last_power
+        self.last_time = last_time
+
+    def update(self, power: float, timestamp: float) -> float:
+        """Add a power reading in W and return the energy in Wh."""
+        if self.last_power is not None and self.last_time is not None:
+            elapsed = timestamp - self.last_time
+            if 0 < elapsed <= MAX_INTEGRATION_GAP:
+                self.energy += (self.last_power + power) / 2 * elapsed / 3600
+        self.last_power = power
+        self.last_time = timestamp
+        return self.energy
+
+    def as_dict(self) -> dict[str, float | None]:
+        """Return the state to store."""
+        return {
+            "energy": self.energy,
+            "last_power": self.last_power,
+            "last_time": self.last_time,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> TrannergyEnergyIntegrator:
+        """Restore a stored state."""
+        return cls(
+            state.get("energy", 0.0), state.get("last_power"), state.get("last_time")
+        )
+
+
+def add_derived_values(
+    data: TrannergyReading, integrator: TrannergyEnergyIntegrator, timestamp: float
+) -> None:
+    """Add total AC power, DC string power, efficiency and integrated energy."""
+    value = data.value
+    power_ac = sum(value(index) for index in _POWER_AC)
+    power_pv = 0.0
+    for voltage, ampere, target in _STRINGS:
+        power = round(value(voltage) * value(ampere), 1)
+        data.set_value(target, power)
+        power_pv += power
+
+    data.set_value(_POWER_AC_TOTAL, power_ac)
+    data.set_value(_POWER_PV_TOTAL, round(power_pv, 1))
+    data.set_value(
+        _EFFICIENCY,
+        round(min(power_ac / power_pv, 1.0) * 100, 1) if power_pv > 0 else None,
+    )
+    data.set_value(_ENERGY_INTEGRATED, round(integrator.update(power_ac, timestamp), 2))
@@ -0,0 +1,40 @@
+"""Diagnostics support for the Trannergy integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_IP_ADDRESS
+from homeassistant.core import HomeAssistant
+
+from . import TrannergyConfigEntry
+from .const import CONF_DEVICE_SERIAL_NUMBER, CONF_INVERTER_SERIAL_NUMBER
+
+TO_REDACT = {
+    CONF_IP_ADDRESS,
+    CONF_DEVICE_SERIAL_NUMBER,
+    CONF_INVERTER_SERIAL_NUMBER,
+    "serial",
+    # The unique ID is the inverter serial, the title is free text that may
+    # name the inverter by its serial or address
+    "unique_id",
+    "title",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: TrannergyConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "scan_interval": coordinator.scan_interval.total_seconds(),
+        "last_update_success": coordinator.last_update_success,
+        "data": async_redact_data(
+            coordinator.data.as_dict() if coordinator.data else {}, TO_REDACT
+        ),
+        "stats": coordinator.trannergy.stats.as_dict(),
+        "circuit_breaker": coordinator.trannergy.breaker.as_dict(),
+    }
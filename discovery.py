@@ -0,0 +1,131 @@
+"""Discovery of Trannergy Wi-Fi loggers on the local network."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Collection
+from dataclasses import dataclass, replace
+import logging
+
+from .trannergy import ReadTrannergyData, TrannergyError
+
+_LOGGER = logging.getLogger(__name__)
+
+# Loggers answer this broadcast with "ip,mac,serial"
+DISCOVERY_PORT = 48899
+DISCOVERY_MESSAGE = b"WIFIKIT-214028-READ"
+
+# Time to collect discovery replies, in seconds
+DEFAULT_DISCOVERY_WINDOW = 2.0
+
+# Time a logger gets to answer the probe for its inverter serial, in seconds
+DEFAULT_PROBE_TIMEOUT = 5.0
+
+# Maximum number of loggers probed at the same time
+PROBE_CONCURRENCY = 32
+
+DEFAULT_PORT = 8899
+
+
+@dataclass(frozen=True, slots=True)
+class DiscoveredLogger:
+    """A Wi-Fi logger that answered the discovery broadcast."""
+
+    ip_address: str
+    mac: str
+    device_serial_number: str
+    # Read from the first telegram, None when the logger did not send one
+    inverter_serial_number: str | None = None
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Collects the replies to the discovery broadcast."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.loggers: dict[str, DiscoveredLogger] = {}
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Parse a reply, ignoring our own broadcast and anything malformed."""
+        parts = data.decode("ascii", "replace").strip().split(",")
+        if len(parts) != 3 or not parts[2].isdigit():
+            return
+        ip_address, mac, serial = parts
+        self.loggers[serial] = DiscoveredLogger(ip_address, mac, serial)
+
+
+async def async_discover_loggers(
+    window: float = DEFAULT_DISCOVERY_WINDOW, broadcast: str = "255.255.255.255"
+) -> list[DiscoveredLogger]:
+    """Broadcast the discovery query and return the loggers that answer."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        _DiscoveryProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+    )
+    try:
+        transport.sendto(DISCOVERY_MESSAGE, (broadcast, DISCOVERY_PORT))
+        await asyncio.sleep(window)
+    finally:
+        transport.close()
+    return list(protocol.loggers.values())
+
+
+async def async_probe_inverter_serial(
+    ip_address: str,
+    device_serial_number: str | int,
+    port: int = DEFAULT_PORT,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+) -> str | None:
+    """Request a telegram from a logger and return the inverter serial in it.
+
+    The request goes through ReadTrannergyData, so it shares the connection
+    and in-flight request of any other client of the logger.
+    """
+    client = ReadTrannergyData(
+        ip_address, port, None, str(device_serial_number), timeout, timeout
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            data = await client.async_getdata()
+    except (TrannergyError, TimeoutError) as err:
+        _LOGGER.debug("Probing %s:%s failed: %s", ip_address, port, err)
+        return None
+    finally:
+        await client.async_close()
+    return data["serial"]
+
+
+async def async_discover(
+    window: float = DEFAULT_DISCOVERY_WINDOW,
+    port: int = DEFAULT_PORT,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+    known_hosts: Collection[str] = (),
+    known_serials: Collection[str] = (),
+) -> list[DiscoveredLogger]:
+    """Discover the loggers and probe them all concurrently for inverter serials.
+
+    Loggers at a known host or with a known device serial are left out before
+    probing, a second connection to a logger that is polled already is
+    handled badly by some of them.
+    """
+    try:
+        loggers = [
+            logger
+            for logger in await async_discover_loggers(window)
+            if logger.ip_address not in known_hosts
+            and logger.device_serial_number not in known_serials
+        ]
+    except OSError as err:
+        _LOGGER.debug("Discovery broadcast failed: %s", err)
+        return []
+
+    semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
+
+    async def _async_probe(logger: DiscoveredLogger) -> DiscoveredLogger:
+        async with semaphore:
+            serial = await async_probe_inverter_serial(
+                logger.ip_address, logger.device_serial_number, port, timeout
+            )
+        return replace(logger, inverter_serial_number=serial)
+
+    return list(await asyncio.gather(*(_async_probe(logger) for logger in loggers)))
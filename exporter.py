@@ -0,0 +1,267 @@
+"""Export of Trannergy readings to rotating files."""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+from .trannergy import FIELD_INDEX, READING_FIELDS, TrannergyReading
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "line_protocol", "parquet")
+
+# Values exported per reading, the serial is written as a tag or column
+EXPORT_FIELDS: tuple[str, ...] = tuple(
+    name for name in READING_FIELDS if name not in ("msg", "serial")
+)
+_EXPORT_INDICES = tuple(FIELD_INDEX[name] for name in EXPORT_FIELDS)
+_SERIAL = FIELD_INDEX["serial"]
+
+# A new file is started when the current one is this old, in seconds
+ROTATE_INTERVAL = 86400
+
+# Readings queued for the writer thread, beyond this readings are dropped
+DEFAULT_QUEUE_SIZE = 10000
+
+# Dropped readings are reported at most this often, in seconds
+DROP_WARNING_INTERVAL = 300
+
+_STOP = object()
+
+_Sample = tuple[float, TrannergyReading]
+
+
+class _CsvWriter:
+    """Writes samples as CSV rows with a header."""
+
+    extension = "csv"
+
+    def __init__(self, path: str) -> None:
+        """Init."""
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(("time", "serial", *EXPORT_FIELDS))
+
+    def write(self, batch: list[_Sample]) -> None:
+        """Write a batch of samples."""
+        self._csv.writerows(
+            (
+                timestamp,
+                reading.value(_SERIAL),
+                *(reading.value(index) for index in _EXPORT_INDICES),
+            )
+            for timestamp, reading in batch
+        )
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class _LineProtocolWriter:
+    """Writes samples in InfluxDB line protocol, one line per sample."""
+
+    extension = "lp"
+
+    def __init__(self, path: str) -> None:
+        """Init."""
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, batch: list[_Sample]) -> None:
+        """Write a batch of samples."""
+        lines = []
+        for timestamp, reading in batch:
+            fields = ",".join(
+                f"{name}={value}i" if isinstance(value, int) else f"{name}={value}"
+                for name, index in zip(EXPORT_FIELDS, _EXPORT_INDICES, strict=True)
+                if (value := reading.value(index)) is not None
+            )
+            serial = reading.value(_SERIAL).strip().replace(" ", r"\ ")
+            lines.append(f"trannergy,serial={serial} {fields} {int(timestamp * 1e9)}\n")
+        self._file.writelines(lines)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Writes samples to a Parquet file, one row group per batch."""
+
+    extension = "parquet"
+
+    def __init__(self, path: str) -> None:
+        """Init, this needs pyarrow."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("time", pa.timestamp("ms", tz="UTC")),
+                ("serial", pa.string()),
+                *((name, pa.float64()) for name in EXPORT_FIELDS),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, batch: list[_Sample]) -> None:
+        """Write a batch of samples."""
+        columns: list[list[Any]] = [
+            [int(timestamp * 1000) for timestamp, _ in batch],
+            [reading.value(_SERIAL) for _, reading in batch],
+            *(
+                [reading.value(index) for _, reading in batch]
+                for index in _EXPORT_INDICES
+            ),
+        ]
+        self._writer.write_table(
+            self._pa.Table.from_arrays(
+                [
+                    self._pa.array(column, type=field.type)
+                    for column, field in zip(columns, self._schema, strict=True)
+                ],
+                schema=self._schema,
+            )
+        )
+
+    def close(self) -> None:
+        """Write the footer and close the file."""
+        self._writer.close()
+
+
+_WRITERS = {
+    "csv": _CsvWriter,
+    "line_protocol": _LineProtocolWriter,
+    "parquet": _ParquetWriter,
+}
+
+
+class TrannergyExporter:
+    """Writes readings to rotating files from a thread of its own.
+
+    Submitting a reading only appends it to a bounded queue. The writer thread
+    collects the queued readings and writes them in batches, whenever
+    flush_size readings are waiting or flush_interval seconds have passed.
+    When the disk stalls the queue fills up and new readings are dropped and
+    counted, so a stalled export never holds up the polls.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        export_format: str,
+        flush_size: int,
+        flush_interval: float,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """Init."""
+        self.directory = directory
+        self.name = name
+        self.export_format = export_format
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._warned = 0.0
+        self._queue: queue.Queue[Any] = queue.Queue(queue_size)
+        self._thread: threading.Thread | None = None
+        self._writer: Any = None
+        self._opened = 0.0
+
+    @property
+    def full(self) -> bool:
+        """Return True while the writer is not keeping up."""
+        return self._queue.full()
+
+    def start(self) -> None:
+        """Open the first file and start the writer thread, this does blocking I/O."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+        self._thread = threading.Thread(
+            target=self._run, name=f"trannergy export {self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, timestamp: float, reading: TrannergyReading) -> bool:
+        """Queue a reading, returning False when it was dropped as the queue is full.
+
+        The reading must not be changed afterwards.
+        """
+        try:
+            self._queue.put_nowait((timestamp, reading))
+        except queue.Full:
+            self.dropped += 1
+            now = time.monotonic()
+            if now - self._warned >= DROP_WARNING_INTERVAL:
+                self._warned = now
+                _LOGGER.warning(
+                    "Export of %s is falling behind, %d readings dropped so far",
+                    self.name,
+                    self.dropped,
+                )
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Write what is queued and stop, this blocks until done."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _open(self) -> None:
+        """Start a new file."""
+        writer = _WRITERS[self.export_format]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{self.name}-{stamp}.{writer.extension}")
+        self._writer = writer(path)
+        self._opened = time.monotonic()
+
+    def _run(self) -> None:
+        """Collect queued readings and write them in batches."""
+        batch: list[_Sample] = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                batch.append(item)
+                if len(batch) < self.flush_size and time.monotonic() < deadline:
+                    continue
+            elif time.monotonic() < deadline:
+                continue
+
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+
+        self._writer.close()
+
+    def _write(self, batch: list[_Sample]) -> None:
+        """Write a batch, rotating the file when it is due."""
+        try:
+            if time.monotonic() - self._opened >= ROTATE_INTERVAL:
+                self._writer.close()
+                self._open()
+            self._writer.write(batch)
+        except OSError as err:
+            _LOGGER.error("Exporting %d readings failed: %s", len(batch), err)
+        except Exception:
+            # Keep the thread alive, or the queue would never drain again
+            _LOGGER.exception("Unexpected error exporting %d readings", len(batch))
@@ -0,0 +1,235 @@
+"""Fleet poller for the Trannergy integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import contextlib
+from dataclasses import dataclass
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import TrannergyUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bound on the time a single inverter may take to answer, in seconds
+FLEET_POLL_DEADLINE = 30.0
+
+# Spread of the poll times around the configured interval
+FLEET_JITTER = 0.05
+
+# The scheduling loop wakes at least this often, in seconds
+FLEET_MAX_SLEEP = 60.0
+
+
+class _PollLimiter:
+    """Lets a limited number of polls run at the same time.
+
+    Unlike a semaphore the limit can change while polls run. A lower limit
+    holds new polls back until enough of the running ones have finished.
+    """
+
+    def __init__(self, limit: int = 1) -> None:
+        """Init."""
+        self._limit = limit
+        self._running = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Return the number of polls that may run at the same time."""
+        return self._limit
+
+    @limit.setter
+    def limit(self, limit: int) -> None:
+        """Change the limit, starting waiting polls if it went up."""
+        self._limit = limit
+        self._wake()
+
+    async def __aenter__(self) -> None:
+        """Wait until a poll may start."""
+        while self._running >= self._limit:
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+                # Hand a wakeup that came too late on to the next poll
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self._running += 1
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Let the next poll start."""
+        self._running -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Wake as many waiting polls as may start."""
+        free = self._limit - self._running
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+@dataclass(slots=True)
+class _FleetMember:
+    """A coordinator polled by the fleet."""
+
+    coordinator: TrannergyUpdateCoordinator
+    concurrency: int
+    due: float
+    polling: bool = False
+
+
+class TrannergyFleet:
+    """Polls all fleet mode inverters from one scheduling loop.
+
+    Every inverter keeps its own polling interval, but polls are started from a
+    single loop and at most `concurrency` of them run at the same time. Start
+    times are staggered over the first interval and every following poll is
+    jittered, so inverters never end up polling in lockstep.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._members: dict[str, _FleetMember] = {}
+        self._limiter = _PollLimiter()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @callback
+    def async_register(
+        self, key: str, coordinator: TrannergyUpdateCoordinator, concurrency: int
+    ) -> None:
+        """Add a coordinator to the fleet."""
+        interval = coordinator.scan_interval.total_seconds()
+        self._members[key] = _FleetMember(
+            coordinator, concurrency, time.monotonic() + random.uniform(0, interval)
+        )
+        self._async_update_concurrency()
+
+        if self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._async_run(), f"{DOMAIN} fleet poller"
+            )
+        self._wakeup.set()
+
+    @callback
+    def async_unregister(self, key: str) -> None:
+        """Remove a coordinator from the fleet."""
+        self._members.pop(key, None)
+        if self._members:
+            self._async_update_concurrency()
+            return
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def empty(self) -> bool:
+        """Return True if no coordinators are registered."""
+        return not self._members
+
+    async def async_first_refresh(self, key: str) -> None:
+        """Run the first refresh of a registered coordinator.
+
+        It waits for its turn like the other polls of the fleet, so inverters
+        set up together do not all poll at once.
+        """
+        member = self._members[key]
+        member.polling = True
+        try:
+            async with self._limiter:
+                await member.coordinator.async_config_entry_first_refresh()
+        finally:
+            self._async_schedule(member)
+
+    @callback
+    def _async_update_concurrency(self) -> None:
+        """Set the limit to the largest one of the registered entries."""
+        self._limiter.limit = max(
+            member.concurrency for member in self._members.values()
+        )
+
+    async def _async_run(self) -> None:
+        """Start the polls that are due and sleep until the next one is."""
+        while True:
+            now = time.monotonic()
+            next_due = now + FLEET_MAX_SLEEP
+            for member in self._members.values():
+                if member.polling:
+                    continue
+                if member.due <= now:
+                    member.polling = True
+                    self.hass.async_create_background_task(
+                        self._async_poll(member),
+                        f"{DOMAIN} fleet poll {member.coordinator.ip_address}",
+                    )
+                else:
+                    next_due = min(next_due, member.due)
+
+            self._wakeup.clear()
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(next_due - now):
+                    await self._wakeup.wait()
+
+    async def _async_poll(self, member: _FleetMember) -> None:
+        """Poll one inverter and hand the result to its coordinator."""
+        coordinator = member.coordinator
+        deadline = min(coordinator.scan_interval.total_seconds(), FLEET_POLL_DEADLINE)
+        try:
+            async with self._limiter:
+                try:
+                    async with asyncio.timeout(deadline):
+                        data = await coordinator.async_fetch_data()
+                except TimeoutError as err:
+                    raise UpdateFailed(
+                        f"No reply from {coordinator.ip_address} within {deadline} s"
+                    ) from err
+        except UpdateFailed as err:
+            coordinator.async_set_update_error(err)
+        except Exception as err:
+            # As the coordinator's own refresh does for unexpected errors
+            _LOGGER.exception("Unexpected error polling %s", coordinator.ip_address)
+            coordinator.async_set_update_error(err)
+        else:
+            coordinator.async_set_updated_data(data)
+        finally:
+            self._async_schedule(member)
+
+    @callback
+    def _async_schedule(self, member: _FleetMember) -> None:
+        """Schedule the next poll of a member after one has finished."""
+        # The interval may have been adapted to what this poll observed
+        interval = member.coordinator.scan_interval.total_seconds()
+        member.polling = False
+        member.due = time.monotonic() + interval * random.uniform(
+            1 - FLEET_JITTER, 1 + FLEET_JITTER
+        )
+        self._wakeup.set()
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> TrannergyFleet:
+    """Return the fleet poller, creating it when needed."""
+    domain_data: dict = hass.data.setdefault(DOMAIN, {})
+    if (fleet := domain_data.get("fleet")) is None:
+        fleet = domain_data["fleet"] = TrannergyFleet(hass)
+    return fleet
@@ -0,0 +1,131 @@
+"""On-demand profiling of Trannergy poll cycles."""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import time
+import tracemalloc
+
+_LOGGER = logging.getLogger(__name__)
+
+# Source lines listed in the allocation summary
+ALLOCATION_LINES = 25
+
+# Allocations made by tracemalloc and the profiler are left out of the summary
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class TrannergyProfiler:
+    """Profiles a number of poll cycles with cProfile and tracemalloc.
+
+    A cycle runs from the start of a poll, or the arrival of a pushed telegram,
+    to the end of the entity updates. Other tasks that run on the event loop
+    while a poll waits for the inverter are profiled as well, so a busy event
+    loop shows up next to the decoder and the entities. Between the cycles
+    nothing is profiled or traced.
+    """
+
+    def __init__(self, cycles: int, path: str) -> None:
+        """Init, the results are written to path with the extensions added."""
+        self.cycles = cycles
+        self.path = path
+        self.durations: list[float] = []
+        self.peak_memory = 0
+        self._profile = cProfile.Profile()
+        self._allocations: dict[tuple[str, int], list[int]] = {}
+        self._started: float | None = None
+        self._tracing = False
+
+    @property
+    def done(self) -> bool:
+        """Return True when all cycles have been profiled."""
+        return len(self.durations) >= self.cycles
+
+    def begin(self) -> None:
+        """Start profiling a cycle."""
+        if self._started is not None or self.done:
+            return
+        # Allocations are only traced when nothing else is tracing them
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        try:
+            self._profile.enable()
+        except ValueError as err:
+            _LOGGER.debug("Cannot profile, another profiler is active: %s", err)
+        self._started = time.perf_counter()
+
+    def end(self) -> bool:
+        """Stop profiling a cycle, returning True after the last one."""
+        if self._started is None:
+            return False
+        self._profile.disable()
+        self.durations.append(time.perf_counter() - self._started)
+        self._started = None
+        if self._tracing:
+            self._add_allocations(tracemalloc.take_snapshot())
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self._tracing = False
+        return self.done
+
+    def abort(self) -> None:
+        """Stop a cycle that is being profiled, without counting it."""
+        if self._started is None:
+            return
+        self._profile.disable()
+        self._started = None
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _add_allocations(self, snapshot: tracemalloc.Snapshot) -> None:
+        """Add the memory still allocated at the end of a cycle, per source line."""
+        snapshot = snapshot.filter_traces(_FILTERS)
+        for statistic in snapshot.statistics("lineno"):
+            frame = statistic.traceback[0]
+            key = (frame.filename, frame.lineno)
+            totals = self._allocations.setdefault(key, [0, 0])
+            totals[0] += statistic.size
+            totals[1] += statistic.count
+
+    def write(self) -> tuple[str, str]:
+        """Write the pstats file and the allocation summary, this does blocking I/O.
+
+        The pstats file can be read by pstats, snakeviz or flameprof. Returns
+        the paths of both files.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        stats_path = f"{self.path}.pstats"
+        summary_path = f"{self.path}-allocations.txt"
+        self._profile.dump_stats(stats_path)
+
+        durations = sorted(self.durations)
+        lines = [
+            f"Cycles: {len(durations)}",
+            f"Duration: mean {sum(durations) / len(durations) * 1000:.1f} ms, "
+            f"median {durations[len(durations) // 2] * 1000:.1f} ms, "
+            f"max {durations[-1] * 1000:.1f} ms",
+        ]
+        if self._allocations:
+            lines.append(f"Peak traced memory: {self.peak_memory / 1024:.1f} KiB")
+            lines.append("")
+            lines.append("Memory left allocated by the cycles, summed per line:")
+            top = sorted(
+                self._allocations.items(), key=lambda item: item[1][0], reverse=True
+            )
+            lines.extend(
+                f"{size / 1024:10.1f} KiB {count:8d} blocks  {filename}:{lineno}"
+                for (filename, lineno), (size, count) in top[:ALLOCATION_LINES]
+            )
+        else:
+            lines.append("Allocations were not traced, tracemalloc was already in use")
+
+        with open(summary_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        return stats_path, summary_path
@@ -0,0 +1,116 @@
+"""Receiver for telegrams pushed by Trannergy Wi-Fi loggers."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN
+from .trannergy import TELEGRAM_MIN_LENGTH, TelegramFrameParser
+
+if TYPE_CHECKING:
+    from .coordinator import TrannergyUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Connections that send nothing for this long are closed, in seconds
+PUSH_IDLE_TIMEOUT = 900.0
+
+
+class TrannergyPushReceiver:
+    """Accepts telegrams that Wi-Fi loggers push to a server address.
+
+    A logger configured with this host as its remote server connects on its
+    own and sends a telegram every few minutes. One listener serves all
+    loggers; every telegram is handed to the coordinator of the inverter
+    whose serial it carries, without any request being sent.
+    """
+
+    def __init__(self, hass: HomeAssistant, port: int) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.port = port
+        self._coordinators: dict[str, TrannergyUpdateCoordinator] = {}
+        self._server: asyncio.Server | None = None
+
+    async def async_register(
+        self, inverter_serial: str, coordinator: TrannergyUpdateCoordinator
+    ) -> None:
+        """Route the telegrams of an inverter to a coordinator."""
+        self._coordinators[inverter_serial] = coordinator
+        if self._server is None:
+            try:
+                self._server = await asyncio.start_server(
+                    self._async_handle_logger, port=self.port
+                )
+            except OSError as err:
+                self._coordinators.pop(inverter_serial)
+                raise HomeAssistantError(
+                    f"Unable to listen for pushed telegrams on port {self.port}: {err}"
+                ) from err
+            _LOGGER.debug("Listening for pushed telegrams on port %s", self.port)
+
+    async def async_unregister(self, inverter_serial: str) -> None:
+        """Stop routing the telegrams of an inverter, closing the listener last."""
+        self._coordinators.pop(inverter_serial, None)
+        if self._coordinators or self._server is None:
+            return
+
+        server, self._server = self._server, None
+        server.close()
+        with contextlib.suppress(AttributeError):
+            server.close_clients()
+        await server.wait_closed()
+
+    @property
+    def empty(self) -> bool:
+        """Return True if no coordinators are registered."""
+        return not self._coordinators
+
+    async def _async_handle_logger(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Receive the telegrams of one logger until it disconnects."""
+        peer = writer.get_extra_info("peername")
+        parser = TelegramFrameParser()
+        try:
+            while True:
+                async with asyncio.timeout(PUSH_IDLE_TIMEOUT):
+                    data = await reader.read(1024)
+                if not data:
+                    break
+                for frame in parser.feed(data):
+                    self._async_dispatch(frame, peer)
+        except (ConnectionError, TimeoutError) as err:
+            _LOGGER.debug("Closing push connection from %s: %s", peer, err)
+        finally:
+            writer.close()
+
+    @callback
+    def _async_dispatch(self, frame: bytes, peer: object) -> None:
+        """Hand a telegram to the coordinator of its inverter."""
+        # Loggers also push short frames without inverter data
+        if len(frame) < TELEGRAM_MIN_LENGTH:
+            return
+
+        serial = frame[15:31].decode("utf-8", "replace")
+        if (coordinator := self._coordinators.get(serial)) is None:
+            _LOGGER.debug("Ignoring telegram from %s for inverter %s", peer, serial)
+            return
+        coordinator.async_handle_push(frame)
+
+
+@callback
+def async_get_push_receiver(hass: HomeAssistant, port: int) -> TrannergyPushReceiver:
+    """Return the push receiver listening on a port, creating it when needed."""
+    receivers: dict[int, TrannergyPushReceiver] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault("push", {})
+    if (receiver := receivers.get(port)) is None:
+        receiver = receivers[port] = TrannergyPushReceiver(hass, port)
+    return receiver
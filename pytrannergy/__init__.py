@@ -0,0 +1,71 @@
+"""Client library for Trannergy inverters, independent of Home Assistant.
+
+The package only uses the standard library and relative imports, so it can be
+copied next to a script or run from the integration directory with
+``python -m pytrannergy``. Names are imported from their module on first use,
+which keeps ``import pytrannergy`` itself nearly free.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .client import (
+        ReadTrannergyData,
+        TrannergyCircuitBreaker,
+        TrannergyConnection,
+        TrannergyPollStats,
+    )
+    from .exceptions import (
+        ReadTrannergyDataError,
+        TrannergyCircuitOpenError,
+        TrannergyConnectionError,
+        TrannergyError,
+    )
+    from .protocol import (
+        READING_FIELDS,
+        TELEGRAM_FIELDS,
+        TelegramFrameParser,
+        TrannergyReading,
+        build_request,
+        decode_telegram,
+        encode_telegram,
+        is_reply,
+    )
+
+_EXPORTS = {
+    "ReadTrannergyData": "client",
+    "TrannergyCircuitBreaker": "client",
+    "TrannergyConnection": "client",
+    "TrannergyPollStats": "client",
+    "ReadTrannergyDataError": "exceptions",
+    "TrannergyCircuitOpenError": "exceptions",
+    "TrannergyConnectionError": "exceptions",
+    "TrannergyError": "exceptions",
+    "READING_FIELDS": "protocol",
+    "TELEGRAM_FIELDS": "protocol",
+    "TelegramFrameParser": "protocol",
+    "TrannergyReading": "protocol",
+    "build_request": "protocol",
+    "decode_telegram": "protocol",
+    "encode_telegram": "protocol",
+    "is_reply": "protocol",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import an exported name from its module on first use."""
+    if (module := _EXPORTS.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the exported names next to the module attributes."""
+    return sorted({*globals(), *__all__})
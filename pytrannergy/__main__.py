@@ -0,0 +1,94 @@
+"""Poll a Trannergy inverter from the command line.
+
+    python -m pytrannergy poll 192.168.1.10 602123456 NLBN1234567890AB
+    python -m pytrannergy stream 192.168.1.10 602123456 NLBN1234567890AB -i 30
+
+Readings are printed as JSON, one line per reading. Stream keeps the
+connection to the Wi-Fi module open and polls until interrupted; failed polls
+are reported on stderr and do not stop it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+DEFAULT_PORT = 8899
+DEFAULT_INTERVAL = 60.0
+
+
+def _print_reading(reading: dict) -> None:
+    """Print a reading with the time it was taken as a JSON line."""
+    print(json.dumps({"time": round(time.time(), 3), **reading}), flush=True)
+
+
+async def _async_run(args: argparse.Namespace) -> int:
+    """Poll once, or until interrupted, and return the exit status."""
+    import asyncio
+
+    from .client import ReadTrannergyData
+    from .exceptions import TrannergyError
+
+    timeouts = {
+        name: value
+        for name, value in (
+            ("connect_timeout", args.connect_timeout),
+            ("read_timeout", args.read_timeout),
+        )
+        if value is not None
+    }
+    client = ReadTrannergyData(
+        args.host, args.port, args.inverter_serial, args.device_serial, **timeouts
+    )
+    try:
+        while True:
+            start = time.monotonic()
+            try:
+                reading = await client.async_getdata()
+            except TrannergyError as err:
+                print(f"Poll failed: {err}", file=sys.stderr, flush=True)
+                if args.command == "poll":
+                    return 1
+            else:
+                _print_reading(reading.as_dict())
+                if args.command == "poll":
+                    return 0
+            await asyncio.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+    finally:
+        await client.async_close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="pytrannergy", description="Poll a Trannergy inverter."
+    )
+    parser.add_argument("command", choices=("poll", "stream"))
+    parser.add_argument("host", help="IP address of the Wi-Fi module")
+    parser.add_argument("device_serial", help="serial number of the Wi-Fi module")
+    parser.add_argument("inverter_serial", help="serial number of the inverter")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="seconds between the polls of stream",
+    )
+    parser.add_argument("--connect-timeout", type=float)
+    parser.add_argument("--read-timeout", type=float)
+    args = parser.parse_args(argv)
+
+    # The client and asyncio are only imported once there is something to poll
+    import asyncio
+
+    with contextlib.suppress(KeyboardInterrupt):
+        return asyncio.run(_async_run(args))
+    return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,643 @@
+"""Asyncio client polling Trannergy inverters through their Wi-Fi module."""
+
+import asyncio
+from collections import Counter, deque
+import contextlib
+import logging
+import socket
+import statistics
+import time
+from typing import Any
+import weakref
+
+from .exceptions import (
+    ReadTrannergyDataError,
+    TrannergyCircuitOpenError,
+    TrannergyConnectionError,
+)
+from .protocol import (
+    TELEGRAM_MIN_LENGTH,
+    TelegramFrameParser,
+    TrannergyReading,
+    build_request,
+    decode_telegram,
+    is_reply,
+)
+
+logger = logging.getLogger(__name__)
+
+# Deadlines for the individual phases of a poll, in seconds
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+
+# An idle connection older than this is assumed to be dropped by the Wi-Fi module
+DEFAULT_IDLE_TIMEOUT = 120.0
+
+# Reconnect backoff bounds, in seconds
+DEFAULT_BACKOFF_MIN = 1.0
+DEFAULT_BACKOFF_MAX = 300.0
+
+# Short telegrams are requested again this often within one poll, after a delay
+DEFAULT_EMPTY_RETRIES = 2
+EMPTY_RETRY_DELAY = 0.5
+
+# Consecutive failed polls that open the circuit, and how long it stays open
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RECOVERY_TIME = 30.0
+DEFAULT_MAX_RECOVERY_TIME = 900.0
+
+# A reply younger than this answers other requests for the same inverter, in seconds
+DEFAULT_SHARE_TTL = 2.0
+
+# Phases of a poll that are timed, see TrannergyPollStats
+POLL_PHASES = ("connect", "send", "first_byte", "frame", "decode", "poll", "entities")
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Number of recent samples the latency statistics are computed over
+LATENCY_WINDOW = 100
+
+
+class LatencyHistogram:
+    """Latency statistics over a rolling window of recent samples."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        """Init."""
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        """Add a sample."""
+        self._samples.append(seconds)
+
+    def extend(self, samples: list[float]) -> None:
+        """Add samples, such as those of another histogram."""
+        self._samples.extend(samples)
+
+    @property
+    def samples(self) -> list[float]:
+        """Return the samples in the window, oldest first."""
+        return list(self._samples)
+
+    @property
+    def last(self) -> float | None:
+        """Return the most recent sample."""
+        return self._samples[-1] if self._samples else None
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the window."""
+        return statistics.fmean(self._samples) if self._samples else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Return a percentile of the window."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def buckets(self) -> dict[str, int]:
+        """Return the number of samples per latency bucket."""
+        counts = dict.fromkeys((f"<={bound}" for bound in LATENCY_BUCKETS), 0)
+        counts["inf"] = 0
+        for sample in self._samples:
+            for bound in LATENCY_BUCKETS:
+                if sample <= bound:
+                    counts[f"<={bound}"] += 1
+                    break
+            else:
+                counts["inf"] += 1
+        return counts
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dict."""
+        return {
+            "samples": len(self._samples),
+            "last": self.last,
+            "mean": self.mean,
+            "p95": self.percentile(95),
+            "buckets": self.buckets(),
+        }
+
+
+class TrannergyPollStats:
+    """Timings of the poll phases and counts of retries and failures."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.latency = {phase: LatencyHistogram() for phase in POLL_PHASES}
+        self.polls = 0
+        self.retries = 0
+        # Polls answered by a request of another client to the same module
+        self.shared = 0
+        self.failures: Counter[str] = Counter()
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Record the duration of a poll phase."""
+        self.latency[phase].add(seconds)
+
+    def record_failure(self, cause: str) -> None:
+        """Count a failure."""
+        self.failures[cause] += 1
+
+    def dump(self) -> tuple[int, int, int, dict[str, int], dict[str, list[float]]]:
+        """Return the counts and latency samples as plain data, for merge()."""
+        return (
+            self.polls,
+            self.retries,
+            self.shared,
+            dict(self.failures),
+            {phase: histogram.samples for phase, histogram in self.latency.items()},
+        )
+
+    def merge(
+        self, dumped: tuple[int, int, int, dict[str, int], dict[str, list[float]]]
+    ) -> None:
+        """Add the counts and samples another client returned with dump()."""
+        polls, retries, shared, failures, latency = dumped
+        self.polls += polls
+        self.retries += retries
+        self.shared += shared
+        self.failures.update(failures)
+        for phase, samples in latency.items():
+            self.latency[phase].extend(samples)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dict."""
+        return {
+            "polls": self.polls,
+            "retries": self.retries,
+            "shared": self.shared,
+            "failures": dict(self.failures),
+            "latency": {
+                phase: histogram.as_dict() for phase, histogram in self.latency.items()
+            },
+        }
+
+
+class TrannergyCircuitBreaker:
+    """Fails polls fast while a Wi-Fi module is known to be down.
+
+    After a number of consecutive failures the circuit opens and polls fail
+    without touching the network. Once the recovery time has passed a single
+    probe is let through (half-open): success closes the circuit, failure opens
+    it again for twice as long, up to a maximum.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_time: float = DEFAULT_RECOVERY_TIME,
+        max_recovery_time: float = DEFAULT_MAX_RECOVERY_TIME,
+    ) -> None:
+        """Init."""
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_recovery_time = max_recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        self._open_time = recovery_time
+        self._retry_at = 0.0
+
+    def before_call(self) -> None:
+        """Raise TrannergyCircuitOpenError unless a call may go ahead."""
+        if self.state == self.CLOSED:
+            return
+        delay = self._retry_at - time.monotonic()
+        if self.state == self.OPEN and delay <= 0:
+            self.state = self.HALF_OPEN
+            return
+        raise TrannergyCircuitOpenError(
+            f"Inverter unreachable, next attempt in {max(delay, 0):.0f} s"
+        )
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._open_time = self.recovery_time
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit when needed."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self._open_time = min(self._open_time * 2, self.max_recovery_time)
+        elif self.failures < self.failure_threshold:
+            return
+        self.state = self.OPEN
+        self._retry_at = time.monotonic() + self._open_time
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state as a dict."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": max(0.0, self._retry_at - time.monotonic()),
+        }
+
+
+class TrannergyConnection:
+    """Persistent TCP connection to a Wi-Fi module.
+
+    The connection is kept open between requests and reopened when it turns out
+    to be dead. Failing connection attempts are retried with exponential backoff
+    so an unreachable module is not hammered with new connections.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        backoff_min: float = DEFAULT_BACKOFF_MIN,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        stats: TrannergyPollStats | None = None,
+    ) -> None:
+        """Init."""
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.stats = stats or TrannergyPollStats()
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._parser = TelegramFrameParser()
+        self._last_used = 0.0
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        """Return True if a usable connection is open."""
+        return (
+            self._writer is not None
+            and self._reader is not None
+            and not self._writer.is_closing()
+            and not self._reader.at_eof()
+        )
+
+    async def async_request(self, request: bytes) -> list[bytes]:
+        """Send a request and return the frames of the reply."""
+        reused = await self._async_ensure_connected()
+        try:
+            return await self._async_exchange(request)
+        except TrannergyConnectionError:
+            await self.async_close()
+            if not reused:
+                raise
+
+        # The module may have silently dropped the connection we reused
+        logger.debug("Stale connection to %s, reconnecting", self.host)
+        self.stats.retries += 1
+        await self._async_ensure_connected()
+        try:
+            return await self._async_exchange(request)
+        except TrannergyConnectionError:
+            await self.async_close()
+            raise
+
+    async def async_close(self) -> None:
+        """Close the connection."""
+        writer = self._writer
+        self._reader = self._writer = None
+        self._parser.clear()
+        if writer is None:
+            return
+        writer.close()
+        with contextlib.suppress(OSError):
+            await writer.wait_closed()
+
+    async def _async_ensure_connected(self) -> bool:
+        """Open a connection if needed, return True if an open one is reused."""
+        if self.connected:
+            if time.monotonic() - self._last_used < self.idle_timeout:
+                return True
+            await self.async_close()
+        elif self._writer is not None:
+            # Half-open: the module closed its side of the connection
+            await self.async_close()
+
+        delay = self._retry_at - time.monotonic()
+        if delay > 0:
+            raise self._error(
+                "backoff", f"Reconnecting to {self.host}:{self.port} in {delay:.0f} s"
+            )
+
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.connect_timeout):
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port
+                )
+        except (TimeoutError, OSError) as err:
+            self._failures += 1
+            self._retry_at = time.monotonic() + min(
+                self.backoff_max, self.backoff_min * 2 ** (self._failures - 1)
+            )
+            if isinstance(err, TimeoutError):
+                raise self._error(
+                    "connect_timeout", f"Timeout connecting to {self.host}:{self.port}"
+                ) from err
+            raise self._error(
+                "connect_error", f"Cannot connect to {self.host}:{self.port}: {err}"
+            ) from err
+
+        self.stats.record("connect", time.perf_counter() - start)
+        self._failures = 0
+        self._retry_at = 0.0
+        self._last_used = time.monotonic()
+
+        # Let the OS probe the connection so dead peers are noticed
+        if (sock := self._writer.get_extra_info("socket")) is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        return False
+
+    async def _async_exchange(self, request: bytes) -> list[bytes]:
+        """Write a request on the open connection and read the reply frames."""
+        assert self._reader is not None and self._writer is not None
+
+        # Whatever is left from an earlier exchange is not part of this reply
+        self._parser.clear()
+        if stale := len(self._reader._buffer):  # noqa: SLF001
+            logger.debug("Discarding %d stale bytes from %s", stale, self.host)
+            await self._reader.read(stale)
+        stats = self.stats
+        try:
+            async with asyncio.timeout(self.read_timeout):
+                start = time.perf_counter()
+                self._writer.write(request)
+                await self._writer.drain()
+                sent = time.perf_counter()
+                stats.record("send", sent - start)
+
+                data = await self._read_chunk()
+                stats.record("first_byte", time.perf_counter() - sent)
+                while not (frames := self._replies(data, request)):
+                    data = await self._read_chunk()
+                stats.record("frame", time.perf_counter() - sent)
+        except TimeoutError as err:
+            raise self._error(
+                "read_timeout", f"Timeout waiting for data from {self.host}"
+            ) from err
+        except OSError as err:
+            raise self._error(
+                "io_error", f"Error communicating with {self.host}: {err}"
+            ) from err
+        except asyncio.CancelledError:
+            # A late reply must not be read as the reply to the next request
+            self._writer.close()
+            self._reader = self._writer = None
+            raise
+
+        self._last_used = time.monotonic()
+        return frames
+
+    def _replies(self, data: bytes, request: bytes) -> list[bytes]:
+        """Return the frames completed by data that reply to request."""
+        frames = []
+        for frame in self._parser.feed(data):
+            if is_reply(frame, request):
+                frames.append(frame)
+            else:
+                logger.debug("Skipping frame that is not a reply: %s", frame.hex())
+        return frames
+
+    async def _read_chunk(self) -> bytes:
+        """Read the bytes that are available, failing if the module hung up."""
+        assert self._reader is not None
+        if not (data := await self._reader.read(1024)):
+            raise self._error("closed", f"Connection closed by {self.host}")
+        return data
+
+    def _error(self, cause: str, message: str) -> TrannergyConnectionError:
+        """Count a failure and return the error to raise for it."""
+        self.stats.record_failure(cause)
+        return TrannergyConnectionError(message)
+
+
+class _SharedLogger:
+    """The connection to one Wi-Fi module, shared by all clients in a loop.
+
+    A Wi-Fi module serves one TCP client at a time, so requests are serialized
+    by a lock. A poll for an inverter that is already being polled waits for
+    that request instead of sending its own, and a reply younger than the
+    share TTL answers new polls for the same inverter directly.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        """Init."""
+        self.connection = TrannergyConnection(host, port)
+        self.lock = asyncio.Lock()
+        # A client that is dropped without being closed stops counting
+        self.clients: weakref.WeakSet[ReadTrannergyData] = weakref.WeakSet()
+        self.pending: dict[
+            tuple[str, str | None], asyncio.Future[TrannergyReading]
+        ] = {}
+        self.recent: dict[tuple[str, str | None], tuple[float, TrannergyReading]] = {}
+
+
+_shared_loggers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[str, int], _SharedLogger]
+] = weakref.WeakKeyDictionary()
+
+
+def _get_shared_logger(host: str, port: int) -> _SharedLogger:
+    """Return the shared connection to a Wi-Fi module for the running loop."""
+    loggers = _shared_loggers.setdefault(asyncio.get_running_loop(), {})
+    if (shared := loggers.get((host, port))) is None:
+        shared = loggers[(host, port)] = _SharedLogger(host, port)
+    return shared
+
+
+class ReadTrannergyData:
+    """Trannegry datas collector class."""
+
+    def __init__(
+        self,
+        inverter_ip: str,
+        inverter_port: int,
+        inverter_serial: str | None,
+        device_serial_number: str,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        empty_retries: int = DEFAULT_EMPTY_RETRIES,
+        share_ttl: float = DEFAULT_SHARE_TTL,
+    ) -> None:
+        """Init."""
+
+        # IP address of the inverter's Wi-Fi module
+        self.inverter_ip = inverter_ip
+
+        # Port number the internal server listens on, defaults to 8899 (See inverter web gui: Advanced -> Port settings)
+        self.inverter_port = inverter_port
+
+        # Inverter serial number (See inverter web gui: Status -> Connected inverter),
+        # None accepts any inverter, as when probing a logger for the serial
+        self.inverter_serial = inverter_serial
+
+        # Device serial number of the Wi-Fi module (See inverter web gui: Status -> Device information)
+        self.device_serial_number = device_serial_number
+
+        # Deadlines for connecting to the Wi-Fi module and for waiting on its reply
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # Extra requests within one poll when only a short telegram is received
+        self.empty_retries = empty_retries
+
+        # Skips polls while the Wi-Fi module is known to be down
+        self.breaker = TrannergyCircuitBreaker()
+
+        # Timings of the poll phases and failure counts
+        self.stats = TrannergyPollStats()
+
+        # Age up to which a reply of another client for this inverter is reused
+        self.share_ttl = share_ttl
+
+        # Persistent connection to the Wi-Fi module, shared with other clients
+        self.__shared: _SharedLogger | None = None
+
+    async def __async_read_serial(self) -> bytes | None:
+        # Send request to the inverter and receive its reply
+        assert self.__shared is not None
+        frames = await self.__shared.connection.async_request(
+            build_request(self.device_serial_number)
+        )
+
+        # Often, a zero length message is received, possibly ahead of the data
+        for rawdata in frames:
+            if len(rawdata) < TELEGRAM_MIN_LENGTH:
+                continue
+
+            serial = str(rawdata[15:31], encoding="UTF-8")
+
+            if self.inverter_serial is not None and serial != self.inverter_serial:
+                self.stats.record_failure("wrong_serial")
+                raise ReadTrannergyDataError(f"Incorrect inverter serial={serial}")
+
+            return rawdata
+
+        return None
+
+    async def async_getdata(self) -> TrannergyReading:
+        """Poll the inverter and return the decoded telegram.
+
+        Concurrent polls of the same inverter share one request, and a reply
+        younger than share_ttl is returned without a request.
+        """
+        if self.__shared is None:
+            self.__shared = _get_shared_logger(self.inverter_ip, self.inverter_port)
+            self.__shared.clients.add(self)
+        shared = self.__shared
+        key = (str(self.device_serial_number), self.inverter_serial)
+
+        if (recent := shared.recent.get(key)) is not None and (
+            time.monotonic() - recent[0] < self.share_ttl
+        ):
+            self.stats.shared += 1
+            return recent[1].copy()
+        if (pending := shared.pending.get(key)) is not None:
+            self.stats.shared += 1
+            return (await asyncio.shield(pending)).copy()
+
+        future: asyncio.Future[TrannergyReading] = (
+            asyncio.get_running_loop().create_future()
+        )
+        shared.pending[key] = future
+        try:
+            async with shared.lock:
+                connection = shared.connection
+                connection.stats = self.stats
+                connection.connect_timeout = self.connect_timeout
+                connection.read_timeout = self.read_timeout
+                data = await self.__async_poll()
+        except (Exception, asyncio.CancelledError) as err:
+            future.set_exception(
+                err
+                if isinstance(err, Exception)
+                else TrannergyConnectionError("Shared request was cancelled")
+            )
+            # Nobody may be waiting for the shared request
+            future.exception()
+            raise
+        finally:
+            del shared.pending[key]
+
+        shared.recent[key] = (time.monotonic(), data.copy())
+        future.set_result(shared.recent[key][1])
+        return data
+
+    async def __async_poll(self) -> TrannergyReading:
+        """Poll the inverter over the shared connection."""
+        try:
+            self.breaker.before_call()
+        except TrannergyCircuitOpenError:
+            self.stats.record_failure("circuit_open")
+            raise
+
+        start = time.perf_counter()
+        try:
+            telegram = await self.__async_read_serial()
+            for _ in range(self.empty_retries):
+                if telegram is not None:
+                    break
+                self.stats.retries += 1
+                await asyncio.sleep(EMPTY_RETRY_DELAY)
+                telegram = await self.__async_read_serial()
+            if telegram is None:
+                self.stats.record_failure("empty_telegram")
+                raise ReadTrannergyDataError("Empty telegram data")
+        except (Exception, asyncio.CancelledError):
+            # A probe cut short by a deadline must not leave the circuit half-open
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+        decode_start = time.perf_counter()
+        data = decode_telegram(telegram)
+        end = time.perf_counter()
+
+        self.stats.record("decode", end - decode_start)
+        self.stats.record("poll", end - start)
+        self.stats.polls += 1
+        return data
+
+    async def async_close(self) -> None:
+        """Close the connection to the Wi-Fi module, once no other client uses it."""
+        if (shared := self.__shared) is None:
+            return
+        self.__shared = None
+        shared.clients.discard(self)
+        if shared.clients:
+            return
+
+        loggers = _shared_loggers.get(asyncio.get_running_loop(), {})
+        if loggers.get((self.inverter_ip, self.inverter_port)) is shared:
+            del loggers[(self.inverter_ip, self.inverter_port)]
+        async with shared.lock:
+            await shared.connection.async_close()
+
+    def getdata(self) -> TrannergyReading:
+        """GetData."""
+
+        async def _async_getdata() -> TrannergyReading:
+            try:
+                return await self.async_getdata()
+            finally:
+                await self.async_close()
+
+        return asyncio.run(_async_getdata())
@@ -0,0 +1,17 @@
+"""Errors raised by the Trannergy protocol client."""
+
+
+class TrannergyError(Exception):
+    """Base class of the Trannergy errors."""
+
+
+class ReadTrannergyDataError(TrannergyError):
+    """Error reading trannergy data."""
+
+
+class TrannergyConnectionError(TrannergyError):
+    """Error connecting to trannergy."""
+
+
+class TrannergyCircuitOpenError(TrannergyConnectionError):
+    """Polling skipped while trannergy is known to be down."""
@@ -0,0 +1,340 @@
+"""Telegram format of the Trannergy Wi-Fi modules: requests, frames and decoding."""
+
+from collections.abc import Iterator, Mapping
+import functools
+import logging
+import struct
+from typing import Any, NamedTuple
+
+from .exceptions import ReadTrannergyDataError
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramField(NamedTuple):
+    """Location and scaling of a value in an inverter telegram."""
+
+    name: str
+    # Byte offset in the telegram and struct format of the raw value
+    offset: int
+    fmt: str
+    # Float values are raw / divisor, integer values are raw * multiplier
+    divisor: float | None = None
+    multiplier: int = 1
+
+
+# Reference
+# https://github.com/XtheOne/Inverter-Data-Logger/blob/master/InverterMsg.py
+#
+#    1: 1,  # len(1)
+#    2: 12,  # msg(12)
+#    3: 15,  # id(15)
+#    4: 31,  # temperature(31)
+#    5: 33,  # v_pv(33,35,37)
+#    6: 39,  # i_pv(39,41,43)
+#    7: 45,  # i_ac(45,47,49)
+#    8: 51,  # v_ac(51,53,55)
+#    9: 57,  # f_ac(57,62,65)
+#    10: 59,  # p_ac(59,63,67)
+#    11: 69,  # e_today(69)
+#    12: 71,  # e_total(71)
+#    13: 75,  # h_total(75)
+#    14: 79,  # run_state(79)
+#    15: 81,  # GVFaultValue(81)
+#    16: 83,  # GVFaultValue(83)
+#    17: 85,  # GZFaultValue(85)
+#    18: 87,  # TmpFaultValue(87)
+#    19: 89,  # PVFaultValue(89)
+#    20: 91,  # GFCIFaultValue(91)
+#    21: 93,  # errorMsg(93)
+#    22: 101,  # main_fwver(101)
+#    23: 121, }  # slave_fwver(121)
+#
+# Phase 2 and 3 values follow the phase 1 value of the same kind, the raw msg
+# is kept as hex and the serial as text.
+
+TELEGRAM_FIELDS: tuple[TelegramField, ...] = (
+    TelegramField("msg", 12, "2s"),
+    TelegramField("serial", 15, "16s"),
+    TelegramField("temperature", 31, "H", divisor=10.0),
+    TelegramField("voltage_pv1", 33, "H", divisor=10.0),
+    TelegramField("voltage_pv2", 35, "H", divisor=10.0),
+    TelegramField("voltage_pv3", 37, "H", divisor=10.0),
+    TelegramField("ampere_pv1", 39, "H", divisor=10.0),
+    TelegramField("ampere_pv2", 41, "H", divisor=10.0),
+    TelegramField("ampere_pv3", 43, "H", divisor=10.0),
+    TelegramField("ampere_ac1", 45, "H", divisor=10.0),
+    TelegramField("ampere_ac2", 47, "H", divisor=10.0),
+    TelegramField("ampere_ac3", 49, "H", divisor=10.0),
+    TelegramField("voltage_ac1", 51, "H", divisor=10.0),
+    TelegramField("voltage_ac2", 53, "H", divisor=10.0),
+    TelegramField("voltage_ac3", 55, "H", divisor=10.0),
+    TelegramField("frequency_ac", 57, "H", divisor=100.0),
+    TelegramField("power_ac1", 59, "H", divisor=1.0),
+    TelegramField("power_ac2", 63, "H", divisor=1.0),
+    TelegramField("power_ac3", 67, "H", divisor=1.0),
+    TelegramField("yield_today", 69, "H", multiplier=10),
+    TelegramField("yield_total", 71, "I", multiplier=100),
+    TelegramField("hrs_total", 75, "I"),
+    TelegramField("runstate", 79, "B"),
+    TelegramField("GVFault_1", 81, "B"),
+    TelegramField("GVFault_2", 83, "B"),
+    TelegramField("GZFault", 85, "B"),
+    TelegramField("TmpFault", 87, "B"),
+    TelegramField("PVFault", 89, "B"),
+    TelegramField("GFCIFault", 91, "B"),
+)
+
+# A valid telegram is at least 103 bytes, shorter ones carry no inverter data
+TELEGRAM_MIN_LENGTH = 103
+
+# Frame delimiters, and the bytes of a frame besides its payload
+FRAME_START = 0x68
+FRAME_END = 0x16
+FRAME_OVERHEAD = 14
+
+# Payload length of the telegrams sent by the Wi-Fi module
+TELEGRAM_PAYLOAD_LENGTH = 0x7D
+
+# Control code of the replies to data requests, acks carry another one
+REPLY_CONTROL = b"\x41\xb0"
+
+
+def _compile_telegram_struct(fields: tuple[TelegramField, ...]) -> struct.Struct:
+    """Compile the field table into one big-endian struct, padding the gaps."""
+    fmt = ">"
+    position = 0
+    for field in fields:
+        if field.offset < position:
+            raise ValueError(f"Overlapping telegram field {field.name}")
+        fmt += f"{field.offset - position}x" if field.offset > position else ""
+        fmt += field.fmt
+        position = field.offset + struct.calcsize(f">{field.fmt}")
+    return struct.Struct(fmt)
+
+
+_TELEGRAM_STRUCT = _compile_telegram_struct(TELEGRAM_FIELDS)
+
+
+@functools.cache
+def _field_index(fields: tuple[str, ...]) -> dict[str, int]:
+    """Return the position of every field name."""
+    return {name: index for index, name in enumerate(fields)}
+
+
+# Every value of a decoded reading, and their position
+READING_FIELDS: tuple[str, ...] = tuple(field.name for field in TELEGRAM_FIELDS)
+FIELD_INDEX: dict[str, int] = _field_index(READING_FIELDS)
+
+# Positions of the telegram values that are scaled or converted when decoding
+_DIVIDED = tuple(
+    (index, field.divisor)
+    for index, field in enumerate(TELEGRAM_FIELDS)
+    if field.divisor is not None
+)
+_MULTIPLIED = tuple(
+    (index, field.multiplier)
+    for index, field in enumerate(TELEGRAM_FIELDS)
+    if field.divisor is None and field.multiplier != 1
+)
+_MSG = FIELD_INDEX["msg"]
+_SERIAL = FIELD_INDEX["serial"]
+
+
+class TrannergyReading(Mapping[str, Any]):
+    """The values of one inverter reading, in a list at fixed positions.
+
+    Values are read by name like a dict, or by their position in the fields
+    with value(), which is what the sensors use. Decoded readings have the
+    READING_FIELDS; an application can extend() them with fields of its own,
+    which are None until they are set.
+    """
+
+    __slots__ = ("_fields", "_index", "_values")
+
+    def __init__(
+        self,
+        values: list[Any] | None = None,
+        fields: tuple[str, ...] = READING_FIELDS,
+    ) -> None:
+        """Init, values are in the order of fields."""
+        self._fields = fields
+        self._index = _field_index(fields)
+        self._values = values if values is not None else [None] * len(fields)
+
+    def __getitem__(self, key: str) -> Any:
+        """Return a value by name."""
+        return self._values[self._index[key]]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Set a value by name."""
+        self._values[self._index[key]] = value
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the field names."""
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        """Return the number of fields."""
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        """Return the values by name."""
+        return f"TrannergyReading({self.as_dict()!r})"
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        """Return the field names, in the order of the values."""
+        return self._fields
+
+    def value(self, index: int) -> Any:
+        """Return the value at a position of the fields."""
+        return self._values[index]
+
+    def set_value(self, index: int, value: Any) -> None:
+        """Set the value at a position of the fields."""
+        self._values[index] = value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the values as a dict."""
+        return dict(zip(self._fields, self._values, strict=True))
+
+    def copy(self) -> "TrannergyReading":
+        """Return a copy that can be changed independently."""
+        return TrannergyReading(self._values.copy(), self._fields)
+
+    def extend(self, fields: tuple[str, ...]) -> "TrannergyReading":
+        """Return a copy with more fields, which follow the current ones."""
+        if fields[: len(self._fields)] != self._fields:
+            raise ValueError("The fields must start with those of the reading")
+        return TrannergyReading(
+            [*self._values, *(None,) * (len(fields) - len(self._fields))], fields
+        )
+
+    @classmethod
+    def from_dict(
+        cls, data: Mapping[str, Any], fields: tuple[str, ...] = READING_FIELDS
+    ) -> "TrannergyReading":
+        """Create a reading from values by name, ignoring unknown names."""
+        return cls([data.get(name) for name in fields], fields)
+
+
+def build_request(device_serial: str | int) -> bytes:
+    """Create request string."""
+
+    # Reference https://github.com/jbouwh/omnikdatalogger/blob/dev/apps/omnikdatalogger/omnik/InverterMsg.py
+    # The request string is build from several parts. The first part is a
+    # fixed 4 char string; the second part is the reversed hex notation of
+    # the Wi-Fi logger s/n twice; then again a fixed string of two chars; a checksum of
+    # the double s/n with an offset; and finally a fixed ending char.
+
+    request_string = b"\x68\x02\x40\x30"
+
+    doublehex = hex(int(device_serial))[2:] * 2
+    hexlist = [
+        bytes.fromhex(doublehex[i : i + 2])
+        for i in reversed(range(0, len(doublehex), 2))
+    ]
+
+    cs_count = 115 + sum([ord(c) for c in hexlist])
+    cs = bytes.fromhex(hex(cs_count)[-2:])
+    request_string += b"".join(hexlist) + b"".join([b"\x01\x00", cs, b"\x16"])
+    return request_string
+
+
+def encode_telegram(
+    values: Mapping[str, Any], device_serial: str | int, inverter_serial: str
+) -> bytes:
+    """Encode values into an inverter telegram, the inverse of decode_telegram."""
+    raw: list[Any] = []
+    for field in TELEGRAM_FIELDS:
+        value = values.get(field.name, 0)
+        if field.name == "msg":
+            raw.append(bytes.fromhex(value or "0000"))
+        elif field.name == "serial":
+            raw.append(inverter_serial.encode())
+        elif field.divisor is not None:
+            raw.append(round(value * field.divisor))
+        else:
+            raw.append(int(value) // field.multiplier)
+
+    frame = bytearray(TELEGRAM_PAYLOAD_LENGTH + FRAME_OVERHEAD)
+    _TELEGRAM_STRUCT.pack_into(frame, 0, *raw)
+    frame[0:2] = bytes((FRAME_START, TELEGRAM_PAYLOAD_LENGTH))
+    frame[2:4] = REPLY_CONTROL
+    frame[4:12] = int(device_serial).to_bytes(4, "little") * 2
+    frame[-2] = sum(frame[1:-2]) & 0xFF
+    frame[-1] = FRAME_END
+    return bytes(frame)
+
+
+def is_reply(frame: bytes, request: bytes) -> bool:
+    """Return True if a frame is the reply to a data request.
+
+    Replies carry the reply control code and the device serial of the request,
+    acks and frames for another Wi-Fi module do not.
+    """
+    return frame[2:4] == REPLY_CONTROL and frame[4:8] == request[4:8]
+
+
+def decode_telegram(telegram: bytes | bytearray | memoryview) -> TrannergyReading:
+    """Decode the values of a raw inverter telegram."""
+    if len(telegram) < _TELEGRAM_STRUCT.size:
+        raise ReadTrannergyDataError("Cannot decode empty telegram data")
+
+    values = list(_TELEGRAM_STRUCT.unpack_from(telegram))
+    for index, divisor in _DIVIDED:
+        values[index] /= divisor
+    for index, multiplier in _MULTIPLIED:
+        values[index] *= multiplier
+    values[_MSG] = values[_MSG].hex()
+    values[_SERIAL] = values[_SERIAL].decode()
+    return TrannergyReading(values)
+
+
+class TelegramFrameParser:
+    """Reassembles telegram frames from a stream of bytes.
+
+    A frame starts with 0x68, followed by the payload length. It ends with a
+    checksum over everything but the start byte, and 0x16. Bytes that are not
+    part of a valid frame are skipped.
+    """
+
+    def __init__(self) -> None:
+        """Init."""
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Add received bytes and return the frames completed by them."""
+        buffer = self._buffer
+        buffer += data
+        frames: list[bytes] = []
+        while True:
+            start = buffer.find(FRAME_START)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                logger.debug("Skipping %d bytes before frame start", start)
+                del buffer[:start]
+            if len(buffer) < 2:
+                break
+
+            length = buffer[1] + FRAME_OVERHEAD
+            if len(buffer) < length:
+                break
+
+            if (
+                buffer[length - 1] == FRAME_END
+                and buffer[length - 2] == sum(buffer[1 : length - 2]) & 0xFF
+            ):
+                frames.append(bytes(buffer[:length]))
+                del buffer[:length]
+            else:
+                # The start byte was part of something else, resync after it
+                del buffer[:1]
+        return frames
+
+    def clear(self) -> None:
+        """Drop buffered bytes."""
+        self._buffer.clear()
@@ -0,0 +1,135 @@
+"""Worker process polling inverters on behalf of another process.
+
+The parent starts ``python -m pytrannergy.worker FD`` from a directory where
+pytrannergy is a top-level package, with FD one end of a socket pair. The
+worker then imports nothing but this package and the standard library. It
+receives poll requests over the socket, keeps the connections to the Wi-Fi
+modules, decodes the telegrams and sends back plain data only, so the parent
+does not need to import the worker's modules to read the replies.
+"""
+
+import asyncio
+from collections.abc import Coroutine
+from multiprocessing.connection import Connection
+import sys
+from typing import Any
+
+from .client import ReadTrannergyData, TrannergyPollStats
+from .exceptions import (
+    ReadTrannergyDataError,
+    TrannergyCircuitOpenError,
+    TrannergyConnectionError,
+)
+
+# Errors passed back by name, the most specific first
+ERRORS: dict[str, type[Exception]] = {
+    error.__name__: error
+    for error in (
+        TrannergyCircuitOpenError,
+        TrannergyConnectionError,
+        ReadTrannergyDataError,
+    )
+}
+
+# What a worker needs to poll an inverter: ip, port, inverter serial, device
+# serial, connect timeout and read timeout
+Target = tuple[str, int, str, Any, float, float]
+
+# Reply to a poll: request id, the values of the reading in READING_FIELDS
+# order, the error name and message, the dumped poll stats and the breaker state
+Reply = tuple[
+    int,
+    list[Any] | None,
+    str | None,
+    str,
+    tuple[Any, ...],
+    dict[str, Any],
+]
+
+
+async def async_serve(connection: Connection) -> None:
+    """Answer poll requests until the parent stops the worker or goes away.
+
+    Requests are ("poll", request_id, key, target) and ("close", key), None
+    stops the worker.
+    """
+    loop = asyncio.get_running_loop()
+    clients: dict[int, ReadTrannergyData] = {}
+    tasks: set[asyncio.Task[None]] = set()
+    stopped = loop.create_future()
+
+    def _start(coro: Coroutine[Any, Any, None]) -> None:
+        task = loop.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def _receive() -> None:
+        try:
+            while connection.poll():
+                if (message := connection.recv()) is None:
+                    raise EOFError
+                if message[0] == "poll":
+                    _, request_id, key, target = message
+                    if (client := clients.get(key)) is None:
+                        ip, port, inverter_serial, device_serial, connect, read = target
+                        client = clients[key] = ReadTrannergyData(
+                            ip, port, inverter_serial, device_serial, connect, read
+                        )
+                    _start(_async_poll(connection, client, request_id))
+                elif (client := clients.pop(message[1], None)) is not None:
+                    _start(client.async_close())
+        except (EOFError, OSError):
+            loop.remove_reader(connection.fileno())
+            if not stopped.done():
+                stopped.set_result(None)
+
+    loop.add_reader(connection.fileno(), _receive)
+    await stopped
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for client in clients.values():
+        await client.async_close()
+
+
+async def _async_poll(
+    connection: Connection, client: ReadTrannergyData, request_id: int
+) -> None:
+    """Poll an inverter and send the decoded reading back."""
+    # Collect the statistics of this poll only, the parent adds them up. An
+    # overlapping poll of the same inverter replaces client.stats with its own
+    # object, so the one of this poll is kept here and sent once.
+    client.stats = stats = TrannergyPollStats()
+    values = error = None
+    message = ""
+    try:
+        reading = await client.async_getdata()
+    except Exception as err:
+        error = next(
+            (name for name, kind in ERRORS.items() if isinstance(err, kind)),
+            ReadTrannergyDataError.__name__,
+        )
+        message = str(err) or repr(err)
+    else:
+        values = list(reading.values())
+    reply: Reply = (
+        request_id,
+        values,
+        error,
+        message,
+        stats.dump(),
+        client.breaker.as_dict(),
+    )
+    try:
+        connection.send(reply)
+    except OSError:
+        pass
+
+
+def main() -> None:
+    """Serve the parent over the socket passed as the first argument."""
+    asyncio.run(async_serve(Connection(int(sys.argv[1]))))
+
+
+if __name__ == "__main__":
+    main()
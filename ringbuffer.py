@@ -0,0 +1,284 @@
+"""Memory-mapped ring buffer of Trannergy readings."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import TYPE_CHECKING, Any
+
+from .trannergy import TELEGRAM_FIELDS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+# Values kept per sample, the text fields of a telegram are left out
+RING_FIELDS: tuple[str, ...] = tuple(
+    field.name for field in TELEGRAM_FIELDS if not field.fmt.endswith("s")
+)
+
+_MAGIC = b"TRRB"
+_VERSION = 1
+
+# Magic, version, field count, capacity, next write position and sample count
+_HEADER = struct.Struct("<4sHHIII")
+_HEADER_SIZE = 32
+
+
+class TrannergyRingBuffer:
+    """Fixed-size ring buffer of timestamped samples in a memory-mapped file.
+
+    Every sample is a float64 timestamp followed by a float32 per field. The
+    header keeps the write position, so the buffer survives restarts. A file
+    written with another capacity keeps its newest samples, one written with
+    other fields is started afresh. Appending is O(1) and
+    overwrites the oldest sample once the buffer is full. Samples are expected
+    in time order, which lets queries find a time range by bisection.
+
+    Samples are appended on the event loop while queries run in the executor.
+    A lock keeps the write position and the samples consistent: queries copy
+    the bytes of their range under it and decode the copy afterwards.
+    """
+
+    def __init__(
+        self, path: str, capacity: int, fields: Sequence[str] = RING_FIELDS
+    ) -> None:
+        """Init."""
+        self.path = path
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._record = struct.Struct(f"<d{len(self.fields)}f")
+        self._file: Any = None
+        self._mmap: mmap.mmap | None = None
+        self._head = 0
+        self._count = 0
+        self._last_time = -math.inf
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open or create the file, this does blocking I/O."""
+        size = _HEADER_SIZE + self.capacity * self._record.size
+        exists = os.path.exists(self.path)
+        samples = None
+        if exists and os.path.getsize(self.path) != size:
+            samples = self._read_resized()
+        fresh = not exists or samples is not None
+        self._file = open(self.path, "w+b" if fresh else "r+b")
+        if fresh:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+        magic, version, fields, capacity, head, count = _HEADER.unpack_from(self._mmap)
+        if (magic, version, fields, capacity) == (
+            _MAGIC,
+            _VERSION,
+            len(self.fields),
+            self.capacity,
+        ):
+            self._head, self._count = head, count
+        else:
+            if exists and samples is None:
+                _LOGGER.warning(
+                    "History in %s was written with other fields, starting afresh",
+                    self.path,
+                )
+            self._head = self._count = 0
+            if samples:
+                self._mmap[_HEADER_SIZE : _HEADER_SIZE + len(samples)] = samples
+                self._count = len(samples) // self._record.size
+                self._head = self._count % self.capacity
+            self._write_header()
+        if self._count:
+            self._last_time = self._time_at(self._count - 1)
+
+    def close(self) -> None:
+        """Flush and close the file, this does blocking I/O."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.flush()
+                self._mmap.close()
+                self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self._count
+
+    def append(self, timestamp: float, data: Mapping[str, Any]) -> None:
+        """Add a sample, overwriting the oldest one when full."""
+        values = [float(data.get(field) or 0) for field in self.fields]
+        with self._lock:
+            mapped = self._mapped()
+            # Keep the samples in time order when the clock steps back
+            timestamp = max(timestamp, self._last_time)
+            self._record.pack_into(
+                mapped,
+                _HEADER_SIZE + self._head * self._record.size,
+                timestamp,
+                *values,
+            )
+            self._last_time = timestamp
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._write_header()
+
+    def query(
+        self, start: float = -math.inf, end: float = math.inf
+    ) -> Iterator[tuple[float, ...]]:
+        """Yield the samples from start up to end, as (timestamp, *values)."""
+        yield from self._record.iter_unpack(self._copy_range(start, end))
+
+    def columns(
+        self, start: float = -math.inf, end: float = math.inf
+    ) -> dict[str, array]:
+        """Return the samples from start up to end as one array per column."""
+        columns = {name: array("d") for name in ("time", *self.fields)}
+        arrays = tuple(columns.values())
+        for sample in self.query(start, end):
+            for column, value in zip(arrays, sample, strict=True):
+                column.append(value)
+        return columns
+
+    def to_numpy(self, start: float = -math.inf, end: float = math.inf) -> np.ndarray:
+        """Return the samples from start up to end as a structured NumPy array.
+
+        The samples are copied from the file in at most two slices, with a
+        time field followed by a field per value. The array owns its memory,
+        so it stays valid after the buffer is closed. This needs NumPy.
+        """
+        import numpy as np
+
+        dtype = np.dtype([("time", "<f8"), *((field, "<f4") for field in self.fields)])
+        return np.frombuffer(self._copy_range(start, end), dtype=dtype).copy()
+
+    def aggregate(
+        self,
+        field: str,
+        bucket: float,
+        start: float = -math.inf,
+        end: float = math.inf,
+    ) -> list[dict[str, float]]:
+        """Return the min, max and mean of a field per bucket of seconds."""
+        position = self.fields.index(field) + 1
+        buckets: list[dict[str, float]] = []
+        current: dict[str, float] | None = None
+        total = 0.0
+        for sample in self.query(start, end):
+            bucket_start = sample[0] - sample[0] % bucket
+            value = sample[position]
+            if current is None or current["start"] != bucket_start:
+                if current is not None:
+                    current["mean"] = total / current["count"]
+                current = {
+                    "start": bucket_start,
+                    "min": value,
+                    "max": value,
+                    "count": 0,
+                }
+                buckets.append(current)
+                total = 0.0
+            current["min"] = min(current["min"], value)
+            current["max"] = max(current["max"], value)
+            current["count"] += 1
+            total += value
+        if current is not None:
+            current["mean"] = total / current["count"]
+        return buckets
+
+    def _copy_range(self, start: float, end: float) -> bytes:
+        """Return a copy of the samples from start up to end, oldest first."""
+        with self._lock:
+            mapped = self._mapped()
+            first = self._bisect(start)
+            count = self._bisect(end) - first
+            if count <= 0:
+                return b""
+            begin = self._offset(first)
+            size = count * self._record.size
+            # The range wraps around the end of the file
+            tail = begin + size - (_HEADER_SIZE + self.capacity * self._record.size)
+            if tail <= 0:
+                return mapped[begin : begin + size]
+            return (
+                mapped[begin : begin + size - tail]
+                + mapped[_HEADER_SIZE : _HEADER_SIZE + tail]
+            )
+
+    def _read_resized(self) -> bytes | None:
+        """Return the newest samples of a file written with another capacity.
+
+        The samples are returned oldest first, as many as fit. Returns None
+        when the file was written with other fields.
+        """
+        with open(self.path, "rb") as file:
+            data = file.read()
+        if len(data) < _HEADER_SIZE:
+            return None
+        magic, version, fields, capacity, head, count = _HEADER.unpack_from(data)
+        size = self._record.size
+        if (
+            (magic, version, fields) != (_MAGIC, _VERSION, len(self.fields))
+            or len(data) != _HEADER_SIZE + capacity * size
+            or count > capacity
+        ):
+            return None
+        _LOGGER.info(
+            "Resizing history in %s from %d to %d samples",
+            self.path,
+            capacity,
+            self.capacity,
+        )
+        records = data[_HEADER_SIZE:]
+        oldest = (head - count) % capacity * size
+        records = records[oldest:] + records[:oldest]
+        return records[max(0, count - self.capacity) * size : count * size]
+
+    def _mapped(self) -> mmap.mmap:
+        """Return the memory map, raising ValueError when the buffer is closed."""
+        if self._mmap is None:
+            raise ValueError(f"History {self.path} is closed")
+        return self._mmap
+
+    def _write_header(self) -> None:
+        """Store the write position and count."""
+        assert self._mmap is not None
+        _HEADER.pack_into(
+            self._mmap,
+            0,
+            _MAGIC,
+            _VERSION,
+            len(self.fields),
+            self.capacity,
+            self._head,
+            self._count,
+        )
+
+    def _offset(self, index: int) -> int:
+        """Return the file offset of the index-th oldest sample."""
+        position = (self._head - self._count + index) % self.capacity
+        return _HEADER_SIZE + position * self._record.size
+
+    def _time_at(self, index: int) -> float:
+        """Return the timestamp of the index-th oldest sample."""
+        assert self._mmap is not None
+        return struct.unpack_from("<d", self._mmap, self._offset(index))[0]
+
+    def _bisect(self, timestamp: float) -> int:
+        """Return the index of the first sample at or after timestamp."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
@@ -0,0 +1,91 @@
+"""Adaptive polling interval for the Trannergy integration."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+import time
+from typing import Any
+
+# Relative change of the AC power per minute above which polling speeds up
+FAST_RAMP_RATE = 0.1
+
+# Polling slows down by this factor while the inverter produces nothing
+IDLE_FACTOR = 4
+
+# Run state the inverter reports while it waits or is off
+RUNSTATE_IDLE = 0
+
+# Failed polls double the interval at most this often, beyond the maximum anyway
+MAX_BACKOFF_DOUBLINGS = 16
+
+
+class TrannergyPollScheduler:
+    """Derives the next polling interval from what the last polls observed.
+
+    Polls speed up to the minimum interval while the AC power ramps quickly,
+    run at the configured interval while it is steady and slow down while the
+    inverter reports it is idle or off. Failed polls back off exponentially.
+    After sunset the interval stretches to sunrise, as the Wi-Fi module is
+    powered by the panels, and failures are not counted then. All intervals
+    are kept within the minimum and maximum.
+    """
+
+    def __init__(
+        self,
+        interval: timedelta,
+        min_interval: timedelta,
+        max_interval: timedelta,
+    ) -> None:
+        """Initialize."""
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.failures = 0
+        self._last_power: float | None = None
+        self._last_time = 0.0
+
+    def next_interval(
+        self,
+        data: Mapping[str, Any] | None,
+        sun_elevation: float | None = None,
+        next_rising: datetime | None = None,
+    ) -> timedelta:
+        """Return the interval until the next poll, data is None after a failure."""
+        if data is None:
+            self._last_power = None
+            if sun_elevation is not None and sun_elevation < 0:
+                return self._night_interval(next_rising)
+            self.failures += 1
+            doublings = min(self.failures, MAX_BACKOFF_DOUBLINGS)
+            return self._clamp(self.interval * 2**doublings)
+
+        self.failures = 0
+        now = time.monotonic()
+        power = float(data.get("power_ac1") or 0)
+        last_power, last_time = self._last_power, self._last_time
+        self._last_power, self._last_time = power, now
+
+        # Readings without a run state, such as restored ones, go by the power
+        runstate = data.get("runstate")
+        if runstate == RUNSTATE_IDLE or (runstate is None and power <= 0):
+            if sun_elevation is not None and sun_elevation < 0:
+                return self._night_interval(next_rising)
+            return self._clamp(self.interval * IDLE_FACTOR)
+
+        if power > 0 and last_power is not None and now > last_time:
+            ramp = abs(power - last_power) / max(power, last_power)
+            if ramp * 60 / (now - last_time) >= FAST_RAMP_RATE:
+                return self.min_interval
+
+        return self._clamp(self.interval)
+
+    def _night_interval(self, next_rising: datetime | None) -> timedelta:
+        """Return the interval until sunrise, or the maximum if unknown."""
+        if next_rising is None:
+            return self.max_interval
+        return self._clamp(next_rising - datetime.now(next_rising.tzinfo))
+
+    def _clamp(self, interval: timedelta) -> timedelta:
+        """Keep an interval within the configured bounds."""
+        return max(self.min_interval, min(self.max_interval, interval))
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import timedelta
+import time
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -13,6 +15,7 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import (
+    PERCENTAGE,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
@@ -21,26 +24,41 @@ from homeassistant.const import (
     UnitOfTemperature,
     UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from . import TrannergyConfigEntry, TrannergyUpdateCoordinator
 from .const import DOMAIN, MANUFACTURER, NAME
+from .deadband import TrannergyDeadband
+from .trannergy import FIELD_INDEX, TrannergyPollStats
 
 ATTRIBUTION = "Data provided by Trannergy inverter"
 
+# Attributes of values restored from storage that were not read since startup
+ATTR_STALE = "stale"
+ATTR_LAST_READING = "last_reading"
+
 PARALLEL_UPDATES = 1
 
+# A sensor writes its state at least this often, even when it did not change
+DEFAULT_HEARTBEAT = timedelta(minutes=15)
+
 
 @dataclass(frozen=True, kw_only=True)
 class TrannergyEntityDescription(SensorEntityDescription):
     """Describes Trannergy inverter sensor entity."""
 
-    value_fn: Callable[[Any], StateType]
+    # Reads the value, sensors without one show the reading field named by key
+    value_fn: Callable[[Any], StateType] | None = None
+    # Changes up to the larger of these are not written to the state machine
+    deadband: float = 0
+    relative_deadband: float = 0
+    heartbeat: timedelta = DEFAULT_HEARTBEAT
 
 
 SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
@@ -51,7 +69,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
         state_class=SensorStateClass.TOTAL,
         device_class=SensorDeviceClass.ENERGY,
-        value_fn=lambda data: data.get("yield_total"),
     ),
     TrannergyEntityDescription(
         name="Today Energy",
@@ -60,7 +77,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
         state_class=SensorStateClass.TOTAL_INCREASING,
         device_class=SensorDeviceClass.ENERGY,
-        value_fn=lambda data: data.get("yield_today"),
     ),
     TrannergyEntityDescription(
         name="AC Power (Phase 1)",
@@ -69,7 +85,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.WATT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.POWER,
-        value_fn=lambda data: data.get("power_ac1"),
+        relative_deadband=0.01,
     ),
     TrannergyEntityDescription(
         name="AC Power (Phase 2)",
@@ -78,7 +94,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.WATT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.POWER,
-        value_fn=lambda data: data.get("power_ac3"),
+        relative_deadband=0.01,
     ),
     TrannergyEntityDescription(
         name="AC Power (Phase 3)",
@@ -87,7 +103,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.WATT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.POWER,
-        value_fn=lambda data: data.get("power_ac3"),
+        relative_deadband=0.01,
     ),
     TrannergyEntityDescription(
         name="AC Frequency",
@@ -96,7 +112,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfFrequency.HERTZ,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.FREQUENCY,
-        value_fn=lambda data: data.get("frequency_ac"),
+        deadband=0.05,
     ),
     TrannergyEntityDescription(
         name="AC Voltage (Phase 1)",
@@ -105,7 +121,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_ac1"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="AC Voltage (Phase 2)",
@@ -114,7 +130,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_ac2"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="AC Voltage (Phase 3)",
@@ -123,7 +139,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_ac3"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="PV Voltage 1",
@@ -132,7 +148,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_pv1"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="PV Voltage 2",
@@ -141,7 +157,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_pv2"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="PV Voltage 3",
@@ -150,7 +166,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.VOLTAGE,
-        value_fn=lambda data: data.get("voltage_pv3"),
+        deadband=1.0,
     ),
     TrannergyEntityDescription(
         name="AC Current (Phase 1)",
@@ -159,7 +175,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_ac1"),
     ),
     TrannergyEntityDescription(
         name="AC Current (Phase 2)",
@@ -168,7 +183,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_ac2"),
     ),
     TrannergyEntityDescription(
         name="AC Current (Phase 3)",
@@ -177,7 +191,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_ac3"),
     ),
     TrannergyEntityDescription(
         name="PV Current 1",
@@ -186,7 +199,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_pv1"),
     ),
     TrannergyEntityDescription(
         name="PV Current 2",
@@ -195,7 +207,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_pv2"),
     ),
     TrannergyEntityDescription(
         name="PV Current 3",
@@ -204,7 +215,6 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.CURRENT,
-        value_fn=lambda data: data.get("ampere_pv3"),
     ),
     TrannergyEntityDescription(
         name="Temperature",
@@ -213,7 +223,7 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        value_fn=lambda data: data.get("temperature"),
+        deadband=0.5,
     ),
     TrannergyEntityDescription(
         name="Total Operating Hours",
@@ -222,7 +232,142 @@ SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfTime.HOURS,
         state_class=SensorStateClass.TOTAL,
         device_class=SensorDeviceClass.DURATION,
-        value_fn=lambda data: data.get("hrs_total"),
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    TrannergyEntityDescription(
+        name="AC Power",
+        icon="mdi:lightning-bolt",
+        key="power_ac_total",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        relative_deadband=0.01,
+    ),
+    TrannergyEntityDescription(
+        name="DC Power (String 1)",
+        icon="mdi:solar-power",
+        key="power_pv1",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        relative_deadband=0.01,
+    ),
+    TrannergyEntityDescription(
+        name="DC Power (String 2)",
+        icon="mdi:solar-power",
+        key="power_pv2",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        relative_deadband=0.01,
+    ),
+    TrannergyEntityDescription(
+        name="DC Power (String 3)",
+        icon="mdi:solar-power",
+        key="power_pv3",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        relative_deadband=0.01,
+    ),
+    TrannergyEntityDescription(
+        name="DC Power",
+        icon="mdi:solar-power",
+        key="power_pv_total",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        relative_deadband=0.01,
+    ),
+    TrannergyEntityDescription(
+        name="Efficiency",
+        icon="mdi:percent",
+        key="efficiency",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        deadband=0.5,
+    ),
+    TrannergyEntityDescription(
+        name="Integrated Energy",
+        icon="mdi:lightning-bolt",
+        key="energy_integrated",
+        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        suggested_display_precision=0,
+        deadband=1.0,
+    ),
+)
+
+
+def _latency_ms(stats: TrannergyPollStats, phase: str) -> StateType:
+    """Return the mean latency of a poll phase in milliseconds."""
+    mean = stats.latency[phase].mean
+    return None if mean is None else round(mean * 1000, 1)
+
+
+DIAGNOSTIC_SENSOR_TYPES: tuple[TrannergyEntityDescription, ...] = (
+    TrannergyEntityDescription(
+        name="Poll Duration",
+        icon="mdi:timer-outline",
+        key="latency_poll",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda stats: _latency_ms(stats, "poll"),
+        relative_deadband=0.1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    TrannergyEntityDescription(
+        name="Connect Duration",
+        icon="mdi:timer-outline",
+        key="latency_connect",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda stats: _latency_ms(stats, "connect"),
+        relative_deadband=0.1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    TrannergyEntityDescription(
+        name="Reply Duration",
+        icon="mdi:timer-outline",
+        key="latency_frame",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda stats: _latency_ms(stats, "frame"),
+        relative_deadband=0.1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    TrannergyEntityDescription(
+        name="Decode Duration",
+        icon="mdi:timer-outline",
+        key="latency_decode",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda stats: _latency_ms(stats, "decode"),
+        relative_deadband=0.1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    TrannergyEntityDescription(
+        name="Poll Retries",
+        icon="mdi:refresh",
+        key="poll_retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.retries,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    TrannergyEntityDescription(
+        name="Poll Failures",
+        icon="mdi:alert-circle-outline",
+        key="poll_failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.failures.total(),
         entity_category=EntityCategory.DIAGNOSTIC,
     ),
 )
@@ -239,6 +384,10 @@ async def async_setup_entry(
     entities = [
         TrannergySensor(coordinator, description) for description in SENSOR_TYPES
     ]
+    entities.extend(
+        TrannergyDiagnosticSensor(coordinator, description)
+        for description in DIAGNOSTIC_SENSOR_TYPES
+    )
 
     async_add_entities(entities, False)
 
@@ -262,6 +411,18 @@ class TrannergySensor(CoordinatorEntity[TrannergyUpdateCoordinator], SensorEntit
         _device_id = f"{coordinator.inverter_serial_number}"
 
         self.entity_description = description
+        # Bind to the position of the value in the reading once, not per update
+        if description.value_fn is None:
+            self._index = FIELD_INDEX[description.key]
+        self._attr_native_value = self._value()
+        self._last_available = coordinator.last_update_success
+        self._last_stale = coordinator.stale
+        self._deadband = TrannergyDeadband(
+            description.deadband,
+            description.relative_deadband,
+            description.heartbeat.total_seconds(),
+            time.monotonic(),
+        )
         self._attr_unique_id = f"{_device_id}-{description.key.lower()}"
         self._attr_device_info = DeviceInfo(
             entry_type=DeviceEntryType.SERVICE,
@@ -270,7 +431,72 @@ class TrannergySensor(CoordinatorEntity[TrannergyUpdateCoordinator], SensorEntit
             name=NAME,
         )
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state when the value moved beyond the deadband."""
+        value = self._value()
+        available = self.available
+        stale = self.coordinator.stale
+        now = time.monotonic()
+        if (
+            available == self._last_available
+            and stale == self._last_stale
+            and not self._deadband.changed(value, self._attr_native_value)
+            and not self._deadband.heartbeat_due(now)
+        ):
+            return
+
+        self._attr_native_value = value
+        self._last_available = available
+        self._last_stale = stale
+        self._deadband.last_write = now
+        self.async_write_ha_state()
+
     @property
-    def native_value(self) -> StateType:
-        """Return the state."""
-        return self.entity_description.value_fn(self.coordinator.data)
+    def available(self) -> bool:
+        """Return True once a reading was received.
+
+        A reading restored from storage stays available while polls fail, until
+        a live reading replaces it.
+        """
+        return (
+            super().available or self.coordinator.stale
+        ) and self.coordinator.data is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return when a value restored from storage was read."""
+        if not self.coordinator.stale or self.coordinator.last_reading_time is None:
+            return None
+        return {
+            ATTR_STALE: True,
+            ATTR_LAST_READING: dt_util.utc_from_timestamp(
+                self.coordinator.last_reading_time
+            ).isoformat(),
+        }
+
+    def _value(self) -> StateType:
+        """Return the current value of the sensor."""
+        if (data := self.coordinator.data) is None:
+            return None
+        if (value_fn := self.entity_description.value_fn) is not None:
+            return value_fn(data)
+        return data.value(self._index)
+
+
+class TrannergyDiagnosticSensor(TrannergySensor):
+    """Define a Trannergy sensor reporting on the polls themselves."""
+
+    @property
+    def available(self) -> bool:
+        """Return True, failing polls are what these sensors report on."""
+        return True
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return None, the statistics are never restored from storage."""
+        return None
+
+    def _value(self) -> StateType:
+        """Return the current value of the sensor."""
+        return self.entity_description.value_fn(self.coordinator.trannergy.stats)
@@ -0,0 +1,215 @@
+"""Services for the Trannergy integration."""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .analytics import analyze
+from .const import DOMAIN
+from .profiler import TrannergyProfiler
+from .ringbuffer import RING_FIELDS
+
+if TYPE_CHECKING:
+    from .coordinator import TrannergyUpdateCoordinator
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_FIELD = "field"
+ATTR_BUCKET = "bucket"
+ATTR_DAYS = "days"
+ATTR_CYCLES = "cycles"
+
+SERVICE_HISTORY = "history"
+SERVICE_REFRESH = "refresh"
+SERVICE_ANALYZE = "analyze"
+SERVICE_PROFILE = "profile"
+
+# Largest number of raw samples a history call returns
+MAX_HISTORY_SAMPLES = 10000
+
+HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_FIELD, default="power_ac1"): vol.In(RING_FIELDS),
+        vol.Optional(ATTR_BUCKET): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+
+REFRESH_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+ANALYZE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_DAYS, default=30): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=3650)
+        ),
+    }
+)
+
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+def _get_coordinator(
+    hass: HomeAssistant, call: ServiceCall, entry_id: str | None = None
+) -> TrannergyUpdateCoordinator:
+    """Return the coordinator of the config entry a service call targets."""
+    if entry_id is None:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Unknown Trannergy config entry {entry_id}")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Config entry {entry.title} is not loaded")
+    return entry.runtime_data
+
+
+def _timestamp(call: ServiceCall, attribute: str, default: float) -> float:
+    """Return a datetime of a service call as a timestamp, naive ones are local."""
+    if (value := call.data.get(attribute)) is None:
+        return default
+    return dt_util.as_local(value).timestamp()
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Trannergy services."""
+
+    async def async_history(call: ServiceCall) -> ServiceResponse:
+        """Return the buffered readings of a field, raw or per bucket."""
+        coordinator = _get_coordinator(hass, call)
+        if (history := coordinator.history) is None:
+            raise ServiceValidationError("History is disabled for this inverter")
+
+        start = _timestamp(call, ATTR_START, -math.inf)
+        end = _timestamp(call, ATTR_END, math.inf)
+        field = call.data[ATTR_FIELD]
+
+        if bucket := call.data.get(ATTR_BUCKET):
+            buckets = await hass.async_add_executor_job(
+                history.aggregate, field, bucket, start, end
+            )
+            for row in buckets:
+                row["start"] = dt_util.utc_from_timestamp(row["start"]).isoformat()
+            return {"buckets": buckets}
+
+        def _samples() -> list[dict[str, float | str]]:
+            position = history.fields.index(field) + 1
+            samples = []
+            for sample in history.query(start, end):
+                samples.append(
+                    {
+                        "time": dt_util.utc_from_timestamp(sample[0]).isoformat(),
+                        field: sample[position],
+                    }
+                )
+                if len(samples) == MAX_HISTORY_SAMPLES:
+                    break
+            return samples
+
+        return {"samples": await hass.async_add_executor_job(_samples)}
+
+    async def async_analyze(call: ServiceCall) -> ServiceResponse:
+        """Return string health and yield trends over the buffered history."""
+        if entry_ids := call.data.get(ATTR_CONFIG_ENTRY_ID):
+            coordinators = [
+                _get_coordinator(hass, call, entry_id) for entry_id in entry_ids
+            ]
+        else:
+            coordinators = [
+                entry.runtime_data
+                for entry in hass.config_entries.async_loaded_entries(DOMAIN)
+            ]
+        histories = {
+            str(coordinator.inverter_serial_number): coordinator.history
+            for coordinator in coordinators
+            if coordinator.history is not None
+        }
+        if not histories:
+            raise ServiceValidationError("History is disabled for these inverters")
+
+        start = dt_util.utcnow().timestamp() - call.data[ATTR_DAYS] * 86400
+        utc_offset = dt_util.now().utcoffset()
+        offset = utc_offset.total_seconds() if utc_offset is not None else 0.0
+
+        def _analyze() -> dict[str, Any]:
+            samples = {
+                serial: history.to_numpy(start) for serial, history in histories.items()
+            }
+            return analyze(samples, offset)
+
+        try:
+            return {"inverters": await hass.async_add_executor_job(_analyze)}
+        except ImportError as err:
+            raise HomeAssistantError(f"Analysis needs NumPy: {err}") from err
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next poll cycles of an inverter."""
+        coordinator = _get_coordinator(hass, call)
+        # cProfile and tracemalloc are process wide, profile one inverter at a time
+        if any(
+            entry.runtime_data.profiler is not None
+            for entry in hass.config_entries.async_loaded_entries(DOMAIN)
+        ):
+            raise ServiceValidationError("A profile is already being taken")
+
+        stamp = dt_util.now().strftime("%Y%m%d-%H%M%S")
+        coordinator.profiler = TrannergyProfiler(
+            call.data[ATTR_CYCLES],
+            hass.config.path(
+                DOMAIN, "profile", f"{coordinator.inverter_serial_number}-{stamp}"
+            ),
+        )
+
+    async def async_refresh(call: ServiceCall) -> None:
+        """Poll the inverter now, within the refresh rate limit."""
+        # Debounced by the coordinator, and answered from a reply that is
+        # still fresh when another client just polled the same inverter
+        await _get_coordinator(hass, call).async_request_refresh()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ANALYZE,
+        async_analyze,
+        schema=ANALYZE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_refresh, schema=REFRESH_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_HISTORY,
+        async_history,
+        schema=HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,267 @@
+"""Polling of Trannergy inverters from a pool of worker processes."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import itertools
+import logging
+from multiprocessing.connection import Connection
+import os
+import socket
+import subprocess
+import sys
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .pytrannergy.worker import ERRORS, Reply, Target
+from .trannergy import (
+    ReadTrannergyData,
+    ReadTrannergyDataError,
+    TrannergyConnectionError,
+    TrannergyPollStats,
+    TrannergyReading,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Time a worker process gets to stop before it is terminated, in seconds
+WORKER_STOP_TIMEOUT = 5.0
+
+# Package directory the workers import pytrannergy from, as a top-level package
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(slots=True)
+class _Worker:
+    """A worker process and the inverters assigned to it."""
+
+    process: subprocess.Popen[bytes] | None = None
+    connection: Connection | None = None
+    keys: set[int] = field(default_factory=set)
+    # Inverters per Wi-Fi module, by ip and port
+    loggers: Counter[tuple[str, int]] = field(default_factory=Counter)
+    # Held while the process is started
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class TrannergyShardClient:
+    """Polls one inverter through a worker process of the shard pool.
+
+    It stands in for ReadTrannergyData in the coordinator. The statistics of
+    the polls are added up here, the circuit breaker lives in the worker and
+    is reported as it was after the last poll.
+    """
+
+    def __init__(
+        self, pool: TrannergyShardPool, worker: _Worker, key: int, target: Target
+    ) -> None:
+        """Init."""
+        self.pool = pool
+        self.worker = worker
+        self.key = key
+        self.target = target
+        self.inverter_ip = target[0]
+        self.inverter_serial = target[2]
+        self.stats = TrannergyPollStats()
+        self.breaker = _BreakerState()
+
+    async def async_getdata(self) -> TrannergyReading:
+        """Poll the inverter and return the decoded telegram."""
+        _, values, error, message, stats, breaker = await self.pool.async_poll(self)
+        self.stats.merge(stats)
+        self.breaker.state = breaker
+        if error is not None:
+            raise ERRORS.get(error, ReadTrannergyDataError)(message)
+        assert values is not None
+        return TrannergyReading(values)
+
+    async def async_close(self) -> None:
+        """Stop polling the inverter, stopping the pool after the last one."""
+        await self.pool.async_remove(self)
+
+
+class _BreakerState:
+    """The state of a circuit breaker in a worker process."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.state: dict[str, Any] = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state as a dict."""
+        return self.state
+
+
+class TrannergyShardPool:
+    """Spreads the polls of a fleet over a small pool of worker processes.
+
+    Every Wi-Fi module is assigned to the worker with the fewest inverters,
+    and all inverters behind it are polled from that worker, so they share its
+    single connection and in-flight requests. The worker keeps the
+    connections to the Wi-Fi modules, polls and decodes, and
+    sends the values of the reading back over a socket, so the event loop of
+    Home Assistant only hands out requests and collects readings. Workers run
+    pytrannergy.worker in a fresh interpreter, which imports neither Home
+    Assistant nor this integration, and a worker that dies is started again on
+    the next poll of one of its inverters.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Init."""
+        self.hass = hass
+        self._workers: list[_Worker] = []
+        self._pending: dict[int, tuple[_Worker, asyncio.Future[Reply]]] = {}
+        self._keys = itertools.count()
+        self._requests = itertools.count()
+
+    @callback
+    def async_add(
+        self, client: ReadTrannergyData, workers: int
+    ) -> TrannergyShardClient:
+        """Return a client polling the inverter of client from a worker process."""
+        while len(self._workers) < workers:
+            self._workers.append(_Worker())
+        logger = (client.inverter_ip, client.inverter_port)
+        worker = next(
+            (worker for worker in self._workers if worker.loggers[logger]),
+            None,
+        ) or min(self._workers, key=lambda worker: len(worker.keys))
+        key = next(self._keys)
+        worker.keys.add(key)
+        worker.loggers[logger] += 1
+        return TrannergyShardClient(
+            self,
+            worker,
+            key,
+            (
+                client.inverter_ip,
+                client.inverter_port,
+                client.inverter_serial,
+                client.device_serial_number,
+                client.connect_timeout,
+                client.read_timeout,
+            ),
+        )
+
+    async def async_poll(self, client: TrannergyShardClient) -> Reply:
+        """Have the worker of a client poll its inverter."""
+        worker = client.worker
+        if worker.connection is None:
+            async with worker.lock:
+                if worker.connection is None:
+                    await self._async_start_worker(worker)
+        assert worker.connection is not None
+
+        request_id = next(self._requests)
+        future: asyncio.Future[Reply] = self.hass.loop.create_future()
+        self._pending[request_id] = (worker, future)
+        try:
+            worker.connection.send(("poll", request_id, client.key, client.target))
+            return await future
+        except OSError as err:
+            raise TrannergyConnectionError(f"Worker process failed: {err}") from err
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def async_remove(self, client: TrannergyShardClient) -> None:
+        """Stop polling the inverter of a client, stopping the pool after the last."""
+        worker = client.worker
+        if client.key not in worker.keys:
+            return
+        worker.keys.discard(client.key)
+        logger = client.target[:2]
+        worker.loggers[logger] -= 1
+        if not worker.loggers[logger]:
+            del worker.loggers[logger]
+        if worker.connection is not None:
+            try:
+                worker.connection.send(("close", client.key))
+            except OSError:
+                self._async_worker_stopped(worker)
+        if not any(worker.keys for worker in self._workers):
+            await self.async_stop()
+
+    async def async_stop(self) -> None:
+        """Stop all worker processes."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            if worker.connection is not None:
+                try:
+                    worker.connection.send(None)
+                except OSError:
+                    pass
+            process = worker.process
+            self._async_worker_stopped(worker)
+            if process is not None:
+                await self.hass.async_add_executor_job(_join, process)
+
+    async def _async_start_worker(self, worker: _Worker) -> None:
+        """Start the process of a worker."""
+
+        def _start() -> tuple[subprocess.Popen[bytes], Connection]:
+            parent, child = socket.socketpair()
+            with parent, child:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "pytrannergy.worker", str(child.fileno())],
+                    cwd=_PACKAGE_DIR,
+                    stdin=subprocess.DEVNULL,
+                    pass_fds=(child.fileno(),),
+                )
+                return process, Connection(parent.detach())
+
+        worker.process, worker.connection = await self.hass.async_add_executor_job(
+            _start
+        )
+        self.hass.loop.add_reader(
+            worker.connection.fileno(), self._async_receive, worker
+        )
+        _LOGGER.debug("Started worker process %s", worker.process.pid)
+
+    @callback
+    def _async_receive(self, worker: _Worker) -> None:
+        """Hand the replies of a worker to the polls waiting for them."""
+        assert worker.connection is not None
+        try:
+            while worker.connection.poll():
+                reply: Reply = worker.connection.recv()
+                # The poll may have timed out in the meantime
+                pending = self._pending.get(reply[0])
+                if pending is not None and not pending[1].done():
+                    pending[1].set_result(reply)
+        except (EOFError, OSError):
+            if worker in self._workers:
+                _LOGGER.error("Worker process %s stopped", worker.process.pid)
+            self._async_worker_stopped(worker)
+
+    @callback
+    def _async_worker_stopped(self, worker: _Worker) -> None:
+        """Forget the process of a worker, failing the polls waiting for it."""
+        if worker.connection is not None:
+            self.hass.loop.remove_reader(worker.connection.fileno())
+            worker.connection.close()
+        worker.connection = worker.process = None
+        for pending_worker, future in self._pending.values():
+            if pending_worker is worker and not future.done():
+                future.set_exception(TrannergyConnectionError("Worker process stopped"))
+
+
+def _join(process: subprocess.Popen[bytes]) -> None:
+    """Wait for a worker process to stop, terminating it when it does not."""
+    try:
+        process.wait(WORKER_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.terminate()
+        process.wait()
+
+
+@callback
+def async_get_shard_pool(hass: HomeAssistant) -> TrannergyShardPool:
+    """Return the shard pool, creating it when needed."""
+    domain_data: dict = hass.data.setdefault(DOMAIN, {})
+    if (pool := domain_data.get("shards")) is None:
+        pool = domain_data["shards"] = TrannergyShardPool(hass)
+    return pool
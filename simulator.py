@@ -0,0 +1,238 @@
+"""Simulated Trannergy Wi-Fi loggers for load tests and offline development."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Sequence
+import contextlib
+from dataclasses import dataclass
+import itertools
+import logging
+import math
+import random
+import time
+
+from .trannergy import (
+    FRAME_END,
+    FRAME_START,
+    TelegramFrameParser,
+    encode_telegram,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Data requests carry this control code after the length byte
+_REQUEST_CONTROL = b"\x40\x30"
+
+
+@dataclass(slots=True)
+class SimulatorBehaviour:
+    """How a simulated logger misbehaves."""
+
+    # Delay before replying, in seconds, plus a random extra of up to jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Send the reply in chunks of this many bytes, 0 sends it at once
+    split: int = 0
+    # Probability of replying with a frame without inverter data
+    empty_ratio: float = 0.0
+    # Probability of not replying at all
+    drop_ratio: float = 0.0
+
+
+def synthesize_values(peak_power: float = 3000.0) -> dict[str, float]:
+    """Return plausible inverter values for the current time of day."""
+    now = time.localtime()
+    hour = now.tm_hour + now.tm_min / 60
+    daylight = max(0.0, math.sin((hour - 6) / 12 * math.pi))
+    power = round(peak_power * daylight * random.uniform(0.95, 1.0))
+    voltage_pv = 300.0 + 40 * daylight if power else 0.0
+    return {
+        "temperature": 20.0 + 25 * daylight,
+        "voltage_pv1": voltage_pv,
+        "voltage_pv2": voltage_pv,
+        "ampere_pv1": round(power / 2 / voltage_pv, 1) if power else 0.0,
+        "ampere_pv2": round(power / 2 / voltage_pv, 1) if power else 0.0,
+        "ampere_ac1": round(power / 230, 1),
+        "voltage_ac1": 230.0,
+        "frequency_ac": 50.0,
+        "power_ac1": power,
+        "yield_today": int(peak_power * 6 * daylight) // 10 * 10,
+        "yield_total": 12_345_600,
+        "hrs_total": 4321,
+        "runstate": 1 if power else 0,
+    }
+
+
+def _short_frame(device_serial: int) -> bytes:
+    """Return a frame without inverter data, as sent by a logger that is idle."""
+    frame = bytearray((FRAME_START, 0x02, 0x41, 0xB0))
+    frame += device_serial.to_bytes(4, "little") * 2 + b"\x00\x00"
+    frame += bytes((sum(frame[1:]) & 0xFF, FRAME_END))
+    return bytes(frame)
+
+
+class TrannergySimulator:
+    """A fake Wi-Fi logger answering data requests on a TCP port.
+
+    Replies are taken round-robin from recorded telegrams or, without those,
+    synthesized from the time of day. Requests for another device serial are
+    ignored, like a real logger does.
+    """
+
+    def __init__(
+        self,
+        device_serial: int,
+        inverter_serial: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        behaviour: SimulatorBehaviour | None = None,
+        telegrams: Sequence[bytes] | None = None,
+    ) -> None:
+        """Init."""
+        self.device_serial = int(device_serial)
+        self.inverter_serial = inverter_serial
+        self.host = host
+        self.port = port
+        self.behaviour = behaviour or SimulatorBehaviour()
+        self.requests = 0
+        self._telegrams = itertools.cycle(telegrams) if telegrams else None
+        self._server: asyncio.Server | None = None
+
+    async def async_start(self) -> None:
+        """Start listening, picking a free port if none was given."""
+        self._server = await asyncio.start_server(
+            self._async_handle_client, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def async_stop(self) -> None:
+        """Stop listening and close all client connections."""
+        if self._server is None:
+            return
+        self._server.close()
+        with contextlib.suppress(AttributeError):
+            self._server.close_clients()
+        await self._server.wait_closed()
+        self._server = None
+
+    def telegram(self) -> bytes:
+        """Return the next telegram to reply with."""
+        if self._telegrams is not None:
+            return next(self._telegrams)
+        return encode_telegram(
+            synthesize_values(), self.device_serial, self.inverter_serial
+        )
+
+    async def _async_handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the requests of one client until it disconnects."""
+        parser = TelegramFrameParser()
+        try:
+            while data := await reader.read(1024):
+                for frame in parser.feed(data):
+                    await self._async_reply(frame, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _async_reply(self, request: bytes, writer: asyncio.StreamWriter) -> None:
+        """Reply to a data request."""
+        if request[2:4] != _REQUEST_CONTROL:
+            return
+        if int.from_bytes(request[4:8], "little") != self.device_serial:
+            _LOGGER.debug("Ignoring request for another device serial")
+            return
+
+        self.requests += 1
+        behaviour = self.behaviour
+        if random.random() < behaviour.drop_ratio:
+            return
+        if random.random() < behaviour.empty_ratio:
+            reply = _short_frame(self.device_serial)
+        else:
+            reply = self.telegram()
+
+        if delay := behaviour.latency + random.uniform(0, behaviour.jitter):
+            await asyncio.sleep(delay)
+
+        chunk = behaviour.split or len(reply)
+        for start in range(0, len(reply), chunk):
+            writer.write(reply[start : start + chunk])
+            await writer.drain()
+
+
+def read_telegrams(path: str) -> list[bytes]:
+    """Read recorded telegrams from a file of back-to-back frames."""
+    with open(path, "rb") as file:
+        return TelegramFrameParser().feed(file.read())
+
+
+async def async_start_simulators(
+    count: int,
+    host: str = "127.0.0.1",
+    base_port: int = 0,
+    behaviour: SimulatorBehaviour | None = None,
+    telegrams: Sequence[bytes] | None = None,
+) -> list[TrannergySimulator]:
+    """Start simulated loggers on consecutive ports, or free ones if base is 0.
+
+    Logger i uses device serial 600000000 + i and inverter serial SIM followed
+    by i, zero padded to 16 characters.
+    """
+    simulators = [
+        TrannergySimulator(
+            600_000_000 + i,
+            f"SIM{i:013d}",
+            host,
+            base_port + i if base_port else 0,
+            behaviour,
+            telegrams,
+        )
+        for i in range(count)
+    ]
+    await asyncio.gather(*(simulator.async_start() for simulator in simulators))
+    return simulators
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run simulators until interrupted."""
+    behaviour = SimulatorBehaviour(
+        args.latency, args.jitter, args.split, args.empty_ratio, args.drop_ratio
+    )
+    telegrams = read_telegrams(args.telegrams) if args.telegrams else None
+    simulators = await async_start_simulators(
+        args.count, args.host, args.port, behaviour, telegrams
+    )
+    for simulator in simulators:
+        print(
+            f"{simulator.host}:{simulator.port} device_serial="
+            f"{simulator.device_serial} inverter_serial={simulator.inverter_serial}"
+        )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await asyncio.gather(*(simulator.async_stop() for simulator in simulators))
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899, help="first port")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--split", type=int, default=0)
+    parser.add_argument("--empty-ratio", type=float, default=0.0)
+    parser.add_argument("--drop-ratio", type=float, default=0.0)
+    parser.add_argument("--telegrams", help="file of recorded telegrams")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Make the integration directory importable for the tests.
+
+Home Assistant is not needed. pytrannergy and the modules without relative
+imports are imported as top-level modules. The other modules that do not
+import Home Assistant are imported from custom_components.trannergy, which
+is registered here without running the __init__ of the integration.
+"""
+
+import os
+import sys
+import time
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+for name, path in (
+    ("custom_components", os.path.dirname(ROOT)),
+    ("custom_components.trannergy", ROOT),
+):
+    package = types.ModuleType(name)
+    package.__path__ = [path]
+    sys.modules.setdefault(name, package)
+
+
+class FakeClock:
+    """Stands in for time.monotonic."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Replace time.monotonic, which the client and the scheduler read."""
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
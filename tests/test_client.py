@@ -0,0 +1,236 @@
+"""Tests of the pytrannergy client."""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+from typing import Self
+
+import pytest
+from conftest import FakeClock
+
+from pytrannergy import client
+from pytrannergy.client import ReadTrannergyData, TrannergyCircuitBreaker
+from pytrannergy.exceptions import TrannergyCircuitOpenError
+from pytrannergy.protocol import (
+    FRAME_END,
+    FRAME_START,
+    TelegramFrameParser,
+    encode_telegram,
+)
+
+DEVICE_SERIAL = 602123456
+INVERTER_SERIAL = "NLBN1234567890AB"
+
+
+def test_breaker_opens_after_threshold(clock: FakeClock) -> None:
+    """The circuit opens after the threshold and then fails fast."""
+    breaker = TrannergyCircuitBreaker(failure_threshold=3, recovery_time=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == breaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(TrannergyCircuitOpenError):
+        breaker.before_call()
+    assert breaker.as_dict()["retry_in"] == 30
+
+
+def test_breaker_half_open_probe(clock: FakeClock) -> None:
+    """One probe goes through after the recovery time, success closes."""
+    breaker = TrannergyCircuitBreaker(failure_threshold=1, recovery_time=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == breaker.HALF_OPEN
+    with pytest.raises(TrannergyCircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    assert breaker.failures == 0
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_doubles_recovery(clock: FakeClock) -> None:
+    """A failed probe opens the circuit for twice as long, up to the maximum."""
+    breaker = TrannergyCircuitBreaker(
+        failure_threshold=1, recovery_time=30, max_recovery_time=100
+    )
+    breaker.record_failure()
+    for recovery in (60, 100, 100):
+        clock.now += 1000
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == breaker.OPEN
+        assert breaker.as_dict()["retry_in"] == recovery
+
+    # Success starts over from the configured recovery time
+    clock.now += 1000
+    breaker.before_call()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.as_dict()["retry_in"] == 30
+
+
+def _ack_frame() -> bytes:
+    """Return a frame acknowledging a request, which is not a reply."""
+    frame = bytearray((FRAME_START, 0x02, 0x44, 0x10))
+    frame += DEVICE_SERIAL.to_bytes(4, "little") * 2 + b"\x00\x00"
+    return bytes(frame + bytes((sum(frame[1:]) & 0xFF, FRAME_END)))
+
+
+class FakeLogger:
+    """A Wi-Fi module answering data requests after a delay.
+
+    The AC power of a reply is 100 W times the number of the request. The
+    reply can be sent more than once, and be followed by an ack, which arrive
+    after the reply has been read.
+    """
+
+    def __init__(
+        self, latency: float = 0.05, repeat: int = 1, ack: bool = False
+    ) -> None:
+        """Init."""
+        self.latency = latency
+        self.repeat = repeat
+        self.ack = ack
+        self.requests = 0
+        self.port = 0
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> Self:
+        """Start listening on a free port."""
+        self._server = await asyncio.start_server(self._async_handle, "127.0.0.1")
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Stop listening."""
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _async_handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Reply to every request of a client."""
+        parser = TelegramFrameParser()
+        try:
+            while data := await reader.read(1024):
+                for _ in parser.feed(data):
+                    self.requests += 1
+                    await asyncio.sleep(self.latency)
+                    reply = encode_telegram(
+                        {"power_ac1": self.requests * 100},
+                        DEVICE_SERIAL,
+                        INVERTER_SERIAL,
+                    )
+                    writer.write(reply)
+                    if self.repeat > 1 or self.ack:
+                        await writer.drain()
+                        await asyncio.sleep(0.01)
+                        writer.write(
+                            reply * (self.repeat - 1)
+                            + (_ack_frame() if self.ack else b"")
+                        )
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _client(logger: FakeLogger, share_ttl: float = 2.0) -> ReadTrannergyData:
+    """Return a client polling the fake logger."""
+    return ReadTrannergyData(
+        "127.0.0.1",
+        logger.port,
+        INVERTER_SERIAL,
+        str(DEVICE_SERIAL),
+        share_ttl=share_ttl,
+    )
+
+
+def test_single_flight_shares_request() -> None:
+    """Concurrent polls of one inverter share one request."""
+
+    async def _async_test() -> None:
+        async with FakeLogger() as logger:
+            clients = [_client(logger) for _ in range(3)]
+            readings = await asyncio.gather(*(c.async_getdata() for c in clients))
+            assert logger.requests == 1
+            assert [reading["power_ac1"] for reading in readings] == [100] * 3
+            assert sum(client.stats.shared for client in clients) == 2
+
+            # Every client gets its own copy of the reading
+            readings[0]["power_ac1"] = 0
+            assert readings[1]["power_ac1"] == 100
+            for client in clients:
+                await client.async_close()
+
+    asyncio.run(_async_test())
+
+
+def test_single_flight_recent_reading() -> None:
+    """A reading younger than the share TTL answers without a request."""
+
+    async def _async_test() -> None:
+        async with FakeLogger(latency=0) as logger:
+            first, second = _client(logger), _client(logger, share_ttl=0)
+            await first.async_getdata()
+            await first.async_getdata()
+            assert logger.requests == 1
+            await second.async_getdata()
+            assert logger.requests == 2
+            await first.async_close()
+            await second.async_close()
+
+    asyncio.run(_async_test())
+
+
+def test_single_flight_closes_after_last_client() -> None:
+    """The shared connection is closed with the last client using it."""
+
+    async def _async_test() -> None:
+        async with FakeLogger(latency=0) as logger:
+            first, second = _client(logger), _client(logger)
+            await asyncio.gather(first.async_getdata(), second.async_getdata())
+            loggers = client._shared_loggers[asyncio.get_running_loop()]
+            assert len(loggers) == 1
+            await first.async_close()
+            assert len(loggers) == 1
+            await second.async_close()
+            await second.async_close()
+            assert not loggers
+
+            # A client dropped without closing does not keep the connection
+            dropped = _client(logger)
+            await dropped.async_getdata()
+            shared = next(iter(loggers.values()))
+            del dropped
+            gc.collect()
+            assert not shared.clients
+
+    asyncio.run(_async_test())
+
+
+@pytest.mark.parametrize(("repeat", "ack"), [(1, True), (2, False), (2, True)])
+def test_connection_reuse_skips_stale_frames(repeat: int, ack: bool) -> None:
+    """Acks and extra replies left on a reused connection are not read as replies."""
+
+    async def _async_test() -> None:
+        async with FakeLogger(latency=0, repeat=repeat, ack=ack) as logger:
+            poller = _client(logger, share_ttl=0)
+            powers = []
+            for _ in range(4):
+                powers.append((await poller.async_getdata())["power_ac1"])
+                # Let the trailing frames arrive before the next request
+                await asyncio.sleep(0.05)
+            assert powers == [100, 200, 300, 400]
+            assert logger.requests == 4
+            assert poller.stats.retries == 0
+            await poller.async_close()
+
+    asyncio.run(_async_test())
@@ -0,0 +1,59 @@
+"""Tests of the deadband and heartbeat of the sensors."""
+
+import pytest
+
+from custom_components.trannergy.deadband import TrannergyDeadband
+
+HEARTBEAT = 900.0
+
+
+@pytest.mark.parametrize(
+    ("value", "changed"), [(230.0, False), (230.9, False), (231.1, True), (228.9, True)]
+)
+def test_absolute_deadband(value: float, changed: bool) -> None:
+    """Changes up to the deadband are not written."""
+    deadband = TrannergyDeadband(1.0, 0, HEARTBEAT, 0)
+    assert deadband.changed(value, 230.0) is changed
+
+
+@pytest.mark.parametrize(
+    ("value", "changed"), [(1010, False), (990, False), (1011, True), (5, True)]
+)
+def test_relative_deadband(value: float, changed: bool) -> None:
+    """Changes up to a fraction of the written value are not written."""
+    deadband = TrannergyDeadband(0, 0.01, HEARTBEAT, 0)
+    assert deadband.changed(value, 1000) is changed
+
+
+def test_larger_deadband_applies() -> None:
+    """The absolute deadband applies to values where the relative one is smaller."""
+    deadband = TrannergyDeadband(5, 0.01, HEARTBEAT, 0)
+    assert not deadband.changed(104, 100)
+    assert not deadband.changed(1009, 1000)
+    assert deadband.changed(1011, 1000)
+
+
+def test_without_deadband() -> None:
+    """Without a deadband any change is written, also from zero."""
+    deadband = TrannergyDeadband(0, 0.01, HEARTBEAT, 0)
+    assert deadband.changed(1, 0)
+    assert not deadband.changed(0, 0)
+
+
+def test_non_numeric_values() -> None:
+    """Values that are not numbers are written when they differ."""
+    deadband = TrannergyDeadband(1.0, 0.01, HEARTBEAT, 0)
+    assert deadband.changed(None, 230.0)
+    assert deadband.changed(230.0, None)
+    assert deadband.changed("fault", "normal")
+    assert not deadband.changed(None, None)
+
+
+def test_heartbeat_forces_write() -> None:
+    """An unchanged value is written again once the heartbeat is due."""
+    deadband = TrannergyDeadband(1.0, 0, HEARTBEAT, 1000.0)
+    assert not deadband.heartbeat_due(1000.0 + HEARTBEAT - 1)
+    assert deadband.heartbeat_due(1000.0 + HEARTBEAT)
+
+    deadband.last_write = 1000.0 + HEARTBEAT
+    assert not deadband.heartbeat_due(1000.0 + HEARTBEAT + 1)
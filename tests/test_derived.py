@@ -0,0 +1,84 @@
+"""Tests of the values derived from readings."""
+
+import pytest
+
+from custom_components.trannergy.derived import (
+    MAX_INTEGRATION_GAP,
+    TrannergyEnergyIntegrator,
+    add_derived_values,
+)
+from custom_components.trannergy.trannergy import (
+    READING_FIELDS,
+    decode_telegram,
+    encode_telegram,
+)
+
+
+def test_trapezoid() -> None:
+    """Energy is the area under the line between successive readings."""
+    integrator = TrannergyEnergyIntegrator()
+    assert integrator.update(1000, 0) == 0
+    # One hour rising from 1000 W to 2000 W averages 1500 W
+    assert integrator.update(2000, 3600) == pytest.approx(1500)
+    assert integrator.update(2000, 5400) == pytest.approx(2500)
+
+
+def test_gap_resets_integration() -> None:
+    """A gap longer than the maximum or a clock stepping back adds nothing."""
+    integrator = TrannergyEnergyIntegrator()
+    integrator.update(1000, 0)
+    assert integrator.update(1000, MAX_INTEGRATION_GAP) == pytest.approx(1000)
+
+    start = 2 * MAX_INTEGRATION_GAP + 1
+    assert integrator.update(3000, start) == pytest.approx(1000)
+    assert integrator.update(3000, start - 60) == pytest.approx(1000)
+
+    # Integration continues from the last reading, 20 minutes before
+    assert integrator.update(3000, start + 1140) == pytest.approx(2000)
+
+
+def test_restore_state() -> None:
+    """A restored integrator continues where the stored one stopped."""
+    integrator = TrannergyEnergyIntegrator()
+    integrator.update(1800, 0)
+    integrator.update(1800, 1800)
+
+    restored = TrannergyEnergyIntegrator.from_dict(integrator.as_dict())
+    assert restored.update(1800, 3600) == pytest.approx(1800)
+    assert TrannergyEnergyIntegrator.from_dict({}).energy == 0
+
+
+def test_add_derived_values() -> None:
+    """Totals, string power and efficiency are computed from the telegram."""
+    values = {
+        "voltage_pv1": 300.0,
+        "ampere_pv1": 4.0,
+        "voltage_pv2": 250.0,
+        "ampere_pv2": 2.0,
+        "power_ac1": 800,
+        "power_ac2": 400,
+        "power_ac3": 400,
+    }
+    reading = decode_telegram(
+        encode_telegram(values, 602123456, "NLBN1234567890AB")
+    ).extend(READING_FIELDS)
+    integrator = TrannergyEnergyIntegrator(last_power=1600, last_time=0)
+
+    add_derived_values(reading, integrator, 360)
+    assert reading["power_pv1"] == 1200
+    assert reading["power_pv2"] == 500
+    assert reading["power_pv3"] == 0
+    assert reading["power_ac_total"] == 1600
+    assert reading["power_pv_total"] == 1700
+    assert reading["efficiency"] == 94.1
+    assert reading["energy_integrated"] == 160
+
+
+def test_efficiency_without_pv_power() -> None:
+    """The efficiency is unknown at night."""
+    reading = decode_telegram(
+        encode_telegram({}, 602123456, "NLBN1234567890AB")
+    ).extend(READING_FIELDS)
+    add_derived_values(reading, TrannergyEnergyIntegrator(), 0)
+    assert reading["power_pv_total"] == 0
+    assert reading["efficiency"] is None
@@ -0,0 +1,69 @@
+"""Tests of the export of readings to files."""
+
+import csv
+import logging
+from pathlib import Path
+
+import pytest
+from conftest import FakeClock
+
+from custom_components.trannergy.exporter import (
+    DROP_WARNING_INTERVAL,
+    EXPORT_FIELDS,
+    TrannergyExporter,
+)
+from custom_components.trannergy.trannergy import (
+    READING_FIELDS,
+    TrannergyReading,
+    decode_telegram,
+    encode_telegram,
+)
+
+INVERTER_SERIAL = "NLBN1234567890AB"
+
+
+def _reading(power: int) -> TrannergyReading:
+    """Return a reading of the integration with the AC power of phase 1."""
+    telegram = encode_telegram({"power_ac1": power}, 602123456, INVERTER_SERIAL)
+    return decode_telegram(telegram).extend(READING_FIELDS)
+
+
+def test_full_queue_drops(clock: FakeClock, caplog: pytest.LogCaptureFixture) -> None:
+    """Readings beyond the queue size are dropped, counted and reported."""
+    exporter = TrannergyExporter("unused", "test", "csv", 10, 60, queue_size=2)
+    assert exporter.submit(0, _reading(100))
+    assert exporter.submit(1, _reading(200))
+    assert exporter.full
+
+    with caplog.at_level(logging.WARNING):
+        assert not exporter.submit(2, _reading(300))
+        assert not exporter.submit(3, _reading(400))
+        assert exporter.dropped == 2
+        assert len(caplog.records) == 1
+
+        clock.now += DROP_WARNING_INTERVAL
+        assert not exporter.submit(4, _reading(500))
+        assert len(caplog.records) == 2
+        assert "3 readings dropped" in caplog.records[-1].getMessage()
+
+
+def test_stop_writes_queued_readings(tmp_path: Path) -> None:
+    """Stopping writes the readings still queued before the file is closed."""
+    exporter = TrannergyExporter(str(tmp_path), "test", "csv", 100, 3600)
+    exporter.start()
+    for step in range(3):
+        assert exporter.submit(1000.0 + step, _reading(100 * step))
+    exporter.stop()
+    exporter.stop()
+
+    (path,) = tmp_path.glob("test-*.csv")
+    with path.open(newline="", encoding="utf-8") as file:
+        header, *rows = csv.reader(file)
+    assert header == ["time", "serial", *EXPORT_FIELDS]
+    power = header.index("power_ac1")
+    assert [(float(row[0]), float(row[power])) for row in rows] == [
+        (1000, 0),
+        (1001, 100),
+        (1002, 200),
+    ]
+    assert {row[1] for row in rows} == {INVERTER_SERIAL}
@@ -0,0 +1,96 @@
+"""Tests of the pytrannergy protocol."""
+
+import pytest
+
+from pytrannergy.exceptions import ReadTrannergyDataError
+from pytrannergy.protocol import (
+    READING_FIELDS,
+    TELEGRAM_FIELDS,
+    TelegramFrameParser,
+    build_request,
+    decode_telegram,
+    encode_telegram,
+)
+
+DEVICE_SERIAL = 602123456
+INVERTER_SERIAL = "NLBN1234567890AB"
+
+VALUES = {
+    "temperature": 41.3,
+    "voltage_pv1": 312.4,
+    "ampere_pv1": 4.2,
+    "voltage_ac1": 231.5,
+    "frequency_ac": 50.01,
+    "power_ac1": 1250,
+    "yield_today": 7200,
+    "yield_total": 12_345_600,
+    "hrs_total": 4321,
+    "runstate": 1,
+}
+
+
+def _telegram(**values: float) -> bytes:
+    """Return a telegram with the default values, updated with values."""
+    return encode_telegram({**VALUES, **values}, DEVICE_SERIAL, INVERTER_SERIAL)
+
+
+def test_decode_round_trip() -> None:
+    """A decoded telegram has the values it was encoded from."""
+    reading = decode_telegram(_telegram())
+    assert reading["serial"] == INVERTER_SERIAL
+    for name, value in VALUES.items():
+        assert reading[name] == pytest.approx(value)
+
+
+def test_reading_has_telegram_fields_only() -> None:
+    """A decoded reading has the telegram fields, an application extends it."""
+    reading = decode_telegram(_telegram())
+    assert reading.fields == READING_FIELDS
+    assert list(reading.as_dict()) == [field.name for field in TELEGRAM_FIELDS]
+
+    fields = (*READING_FIELDS, "power_ac_total")
+    extended = reading.extend(fields)
+    assert extended.fields == fields
+    assert extended["power_ac_total"] is None
+    assert extended["power_ac1"] == reading["power_ac1"]
+    extended["power_ac1"] = 0
+    assert reading["power_ac1"] == 1250
+    assert extended.copy().fields == fields
+
+    with pytest.raises(ValueError):
+        reading.extend(("power_ac_total", *READING_FIELDS))
+
+
+def test_decode_empty() -> None:
+    """An empty telegram cannot be decoded."""
+    with pytest.raises(ReadTrannergyDataError):
+        decode_telegram(b"")
+
+
+def test_parser_split_frame() -> None:
+    """A frame arriving in pieces is returned once it is complete."""
+    telegram = _telegram()
+    parser = TelegramFrameParser()
+    frames = []
+    for start in range(0, len(telegram), 7):
+        frames += parser.feed(telegram[start : start + 7])
+    assert frames == [telegram]
+
+
+def test_parser_merged_frames() -> None:
+    """Frames arriving together are returned separately, in order."""
+    first, second = _telegram(power_ac1=100), _telegram(power_ac1=200)
+    request = build_request(DEVICE_SERIAL)
+    parser = TelegramFrameParser()
+    assert parser.feed(first + request + second[:20]) == [first, request]
+    assert parser.feed(second[20:]) == [second]
+
+
+def test_parser_skips_garbage() -> None:
+    """Bytes around frames and frames with a bad checksum are skipped."""
+    telegram = _telegram()
+    corrupt = bytearray(telegram)
+    corrupt[-2] ^= 0xFF
+    parser = TelegramFrameParser()
+    assert parser.feed(b"\x00\x16" + bytes(corrupt) + b"\x68" + telegram) == [telegram]
+    assert parser.feed(b"") == []
@@ -0,0 +1,124 @@
+"""Tests of the history ring buffer."""
+
+import logging
+import math
+from pathlib import Path
+
+import pytest
+
+from custom_components.trannergy.ringbuffer import TrannergyRingBuffer
+
+FIELDS = ("power_ac1", "yield_today")
+
+
+def _open(
+    path: Path, capacity: int, fields: tuple[str, ...] = FIELDS
+) -> TrannergyRingBuffer:
+    """Return an opened ring buffer."""
+    history = TrannergyRingBuffer(str(path), capacity, fields)
+    history.open()
+    return history
+
+
+def _fill(history: TrannergyRingBuffer, times: range) -> None:
+    """Append a sample at every time, with the time as the power."""
+    for time in times:
+        history.append(float(time), {"power_ac1": time, "yield_today": 2 * time})
+
+
+def test_wraparound(tmp_path: Path) -> None:
+    """A full buffer overwrites its oldest samples and survives reopening."""
+    history = _open(tmp_path / "ring", 5)
+    _fill(history, range(12))
+    assert len(history) == 5
+    assert list(history.query()) == [(t, t, 2 * t) for t in range(7, 12)]
+    history.close()
+
+    history = _open(tmp_path / "ring", 5)
+    assert [sample[0] for sample in history.query()] == [7, 8, 9, 10, 11]
+    _fill(history, range(12, 14))
+    assert [sample[0] for sample in history.query()] == [9, 10, 11, 12, 13]
+    history.close()
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "expected"),
+    [
+        (-math.inf, math.inf, list(range(3, 10))),
+        (5, 8, [5, 6, 7]),
+        (4.5, 5.5, [5]),
+        (0, 3, []),
+        (9, math.inf, [9]),
+        (20, 30, []),
+    ],
+)
+def test_range_query(tmp_path: Path, start: float, end: float, expected: list) -> None:
+    """Queries return the samples from start up to end, across the wrap."""
+    history = _open(tmp_path / "ring", 7)
+    _fill(history, range(10))
+    assert [sample[0] for sample in history.query(start, end)] == expected
+    assert list(history.columns(start, end)["power_ac1"]) == expected
+    history.close()
+
+
+def test_aggregate(tmp_path: Path) -> None:
+    """Aggregates hold the min, max and mean per bucket."""
+    history = _open(tmp_path / "ring", 10)
+    _fill(history, range(10))
+    assert history.aggregate("power_ac1", 5) == [
+        {"start": 0, "min": 0, "max": 4, "count": 5, "mean": 2},
+        {"start": 5, "min": 5, "max": 9, "count": 5, "mean": 7},
+    ]
+    history.close()
+
+
+def test_clock_steps_back(tmp_path: Path) -> None:
+    """Samples stay in time order when the clock steps back."""
+    history = _open(tmp_path / "ring", 5)
+    _fill(history, range(10, 12))
+    history.append(5.0, {"power_ac1": 1})
+    assert [sample[0] for sample in history.query()] == [10, 11, 11]
+    history.close()
+
+
+def test_append_after_close(tmp_path: Path) -> None:
+    """A closed buffer refuses new samples and queries."""
+    history = _open(tmp_path / "ring", 5)
+    _fill(history, range(3))
+    history.close()
+    history.close()
+    with pytest.raises(ValueError):
+        history.append(3.0, {"power_ac1": 3})
+    with pytest.raises(ValueError):
+        list(history.query())
+
+
+@pytest.mark.parametrize(
+    ("capacity", "expected"), [(3, [7, 8, 9]), (8, [4, 5, 6, 7, 8, 9])]
+)
+def test_resize_keeps_newest(tmp_path: Path, capacity: int, expected: list) -> None:
+    """Another capacity keeps the newest samples that fit."""
+    history = _open(tmp_path / "ring", 6)
+    _fill(history, range(10))
+    history.close()
+
+    history = _open(tmp_path / "ring", capacity)
+    assert [sample[0] for sample in history.query()] == expected
+    _fill(history, range(10, 11))
+    assert [sample[0] for sample in history.query()][-2:] == [9, 10]
+    history.close()
+
+
+def test_other_fields_start_afresh(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """A file written with other fields is started afresh, with a warning."""
+    history = _open(tmp_path / "ring", 6)
+    _fill(history, range(10))
+    history.close()
+
+    with caplog.at_level(logging.WARNING):
+        history = _open(tmp_path / "ring", 6, ("power_ac1",))
+    assert len(history) == 0
+    assert "starting afresh" in caplog.text
+    history.close()
@@ -0,0 +1,81 @@
+"""Tests of the adaptive polling scheduler."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from conftest import FakeClock
+
+from scheduler import IDLE_FACTOR, TrannergyPollScheduler
+
+INTERVAL = timedelta(seconds=60)
+MIN_INTERVAL = timedelta(seconds=15)
+MAX_INTERVAL = timedelta(hours=1)
+
+
+@pytest.fixture
+def poll_scheduler() -> TrannergyPollScheduler:
+    """Return a scheduler with a one minute interval."""
+    return TrannergyPollScheduler(INTERVAL, MIN_INTERVAL, MAX_INTERVAL)
+
+
+def test_steady_power(poll_scheduler: TrannergyPollScheduler, clock: FakeClock) -> None:
+    """Steady production polls at the configured interval."""
+    for _ in range(3):
+        clock.now += 60
+        interval = poll_scheduler.next_interval({"power_ac1": 1000, "runstate": 1})
+        assert interval == INTERVAL
+
+
+def test_ramping_power(
+    poll_scheduler: TrannergyPollScheduler, clock: FakeClock
+) -> None:
+    """Quickly changing power polls at the minimum interval."""
+    poll_scheduler.next_interval({"power_ac1": 1000, "runstate": 1})
+    clock.now += 60
+    interval = poll_scheduler.next_interval({"power_ac1": 1500, "runstate": 1})
+    assert interval == MIN_INTERVAL
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"power_ac1": 0, "runstate": 0},
+        {"power_ac1": 50, "runstate": 0},
+        {"power_ac1": 0},
+    ],
+)
+def test_idle(poll_scheduler: TrannergyPollScheduler, data: dict) -> None:
+    """An idle run state, or no power without one, slows polling down."""
+    assert poll_scheduler.next_interval(data) == INTERVAL * IDLE_FACTOR
+
+
+def test_running_without_power(poll_scheduler: TrannergyPollScheduler) -> None:
+    """A running inverter is polled normally, even without power."""
+    assert poll_scheduler.next_interval({"power_ac1": 0, "runstate": 1}) == INTERVAL
+
+
+def test_failure_backoff(poll_scheduler: TrannergyPollScheduler) -> None:
+    """Failures double the interval up to the maximum, success resets it."""
+    intervals = [poll_scheduler.next_interval(None) for _ in range(8)]
+    assert intervals[:5] == [INTERVAL * 2**n for n in range(1, 6)]
+    assert intervals[5:] == [MAX_INTERVAL] * 3
+    poll_scheduler.next_interval({"power_ac1": 1000, "runstate": 1})
+    assert poll_scheduler.failures == 0
+    assert poll_scheduler.next_interval(None) == INTERVAL * 2
+
+
+def test_long_outage(poll_scheduler: TrannergyPollScheduler) -> None:
+    """Days of failed polls stay at the maximum instead of overflowing."""
+    intervals = [poll_scheduler.next_interval(None) for _ in range(10_000)]
+    assert max(intervals) == intervals[-1] == MAX_INTERVAL
+
+
+def test_night(poll_scheduler: TrannergyPollScheduler) -> None:
+    """At night polls wait for sunrise and failures are not counted."""
+    sunrise = datetime.now(UTC) + timedelta(minutes=30)
+    interval = poll_scheduler.next_interval(None, -10, sunrise)
+    assert timedelta(minutes=29) < interval <= timedelta(minutes=30)
+    assert poll_scheduler.failures == 0
+    assert poll_scheduler.next_interval(None, -10) == MAX_INTERVAL
+    assert poll_scheduler.next_interval({"power_ac1": 0}, -10) == MAX_INTERVAL
+    assert poll_scheduler.failures == 0